@@ -61,4 +61,17 @@ _GUROBI_MODEL_ATTR = {
 }
 
 INFO_ATTR_TO_MODEL_ATTR = {v: k for k, v in _GUROBI_MODEL_ATTR.items()}
+
+CALLBACK_WHERE_NAMES = {
+    0: "POLLING",
+    1: "PRESOLVE",
+    2: "SIMPLEX",
+    3: "MIP",
+    4: "MIPSOL",
+    5: "MIPNODE",
+    6: "MESSAGE",
+    7: "BARRIER",
+    8: "MULTIOBJ",
+    9: "IIS",
+}
 EPS=1e-4
@@ -1,13 +1,28 @@
 import dataclasses
 import json
+import lzma
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
 import dacite
+import numpy as np
+import scipy.sparse
 
-from typing import ClassVar, Dict, Any, Tuple, Union, NewType, Callable
-from .constants import _GUROBI_MODEL_ATTR, INFO_ATTR_TO_MODEL_ATTR, EPS
+from typing import ClassVar, Dict, Any, Tuple, Union, NewType, Callable, Mapping, List
+from .constants import _GUROBI_MODEL_ATTR, INFO_ATTR_TO_MODEL_ATTR, CALLBACK_WHERE_NAMES, EPS
 from .core import take
 from gurobi import *
 from functools import wraps
-from collections import deque
+from contextlib import contextmanager
+from collections import OrderedDict, defaultdict
+from itertools import compress
+import heapq
+import time
+from array import array
 from .json import JSONSerialisableDataclass
 
 VarDict = Dict[Union[int, Tuple[int, ...]], Var]
@@ -90,17 +105,882 @@ class GurobiModelInformation(JSONSerialisableDataclass):
     kappa: float
 
 
-def _wrap_callback(callback):
+_INFO_FIELDS = tuple((f.name, INFO_ATTR_TO_MODEL_ATTR[f.name], f.type)
+                     for f in dataclasses.fields(GurobiModelInformation))
+
+
+def _get_model_information(get_attr: Callable[[str], Any]) -> GurobiModelInformation:
+    """
+    Build a :py:class:`GurobiModelInformation` from ``get_attr(model_attr)``, which returns ``None`` for unavailable
+    attributes.  Gurobi has no batch query for model attributes, so callers pass
+    :py:meth:`ModelWrapper._get_attr` and the values come from the wrapper's attribute snapshot, shared with the
+    attribute properties, rather than from another round of ``getAttr`` calls.
+    """
+    kwargs = {}
+    for name, model_attr, type_ in _INFO_FIELDS:
+        val = get_attr(model_attr)
+        kwargs[name] = None if val is None else type_(val)
+    return GurobiModelInformation(**kwargs)
+
+
+@dataclasses.dataclass
+class CallbackProfile(JSONSerialisableDataclass):
+    """
+    Time spent in user callback code and the number of cuts, lazy constraints and heuristic solutions added, per
+    callback `where` (keyed by name, eg ``'MIPSOL'``).  Times are wall-clock seconds.
+    """
+    calls: Dict[str, int]
+    total_time: Dict[str, float]
+    min_time: Dict[str, float]
+    max_time: Dict[str, float]
+    p50_time: Dict[str, float]
+    p90_time: Dict[str, float]
+    p99_time: Dict[str, float]
+    cuts: Dict[str, int]
+    lazy_constraints: Dict[str, int]
+    solutions: Dict[str, int]
+
+
+@dataclasses.dataclass
+class RaceResult(JSONSerialisableDataclass):
+    """
+    Outcome of :py:meth:`BaseGurobiModel.race`.  ``winner`` is the index of the winning parameter set (``None`` if
+    no run found a solution); the other fields are lists with one entry per parameter set, ``None`` for runs which
+    were never started or found no solution.
+    """
+    winner: int
+    params: List[Dict[str, Any]]
+    status: List[int]
+    obj_val: List[float]
+    obj_bound: List[float]
+    runtime: List[float]
+
+
+@dataclasses.dataclass
+class RowGenerationTrace(JSONSerialisableDataclass):
+    """
+    Per-iteration record of :py:meth:`BaseGurobiModel.row_generation`: solver status and objective, wall-clock
+    seconds spent solving, separating and adding rows, and ``rows[group]``, the number of rows added to each group.
+    ``stop_reason`` is one of ``'converged'``, ``'iteration_limit'``, ``'time_limit'`` or ``'status'`` (the solve did
+    not end with an optimal solution).
+    """
+    status: List[int] = dataclasses.field(default_factory=list)
+    obj_val: List[float] = dataclasses.field(default_factory=list)
+    solve_time: List[float] = dataclasses.field(default_factory=list)
+    separation_time: List[float] = dataclasses.field(default_factory=list)
+    add_time: List[float] = dataclasses.field(default_factory=list)
+    rows: Dict[str, List[int]] = dataclasses.field(default_factory=dict)
+    stop_reason: str = None
+
+    @property
+    def iterations(self):
+        return len(self.status)
+
+
+@dataclasses.dataclass
+class SolutionPool:
+    """
+    The solution pool of a model as a (solutions x variables) matrix, with variables in the order of the flat variable
+    layout; ``keys[name]`` and ``slices[name]`` give the keys and column range of family ``name``.  ``obj_vals`` holds
+    the objective value of each solution.
+    """
+    values: Union[np.ndarray, scipy.sparse.csr_matrix]
+    obj_vals: np.ndarray
+    keys: Dict[str, Any]
+    slices: Dict[str, slice]
+
+    def get_family(self, name: str):
+        """The keys and the (solutions x family size) block of values of family ``name``."""
+        return self.keys[name], self.values[:, self.slices[name]]
+
+
+@dataclasses.dataclass
+class BasisSnapshot:
+    """
+    Simplex basis and duals of an LP, see :py:meth:`BaseGurobiModel.get_basis`.  ``vbasis`` and ``rc`` are aligned with
+    the flat variable layout (``var_keys[name]`` and ``var_slices[name]`` give the keys and range of family ``name``),
+    ``cbasis`` and ``pi`` likewise with the constraint groups (``cons_keys``, ``cons_slices``).  ``rc`` and ``pi`` are
+    ``None`` if duals were not available.
+    """
+    vbasis: np.ndarray
+    rc: np.ndarray
+    var_keys: Dict[str, Any]
+    var_slices: Dict[str, slice]
+    cbasis: np.ndarray
+    pi: np.ndarray
+    cons_keys: Dict[str, List]
+    cons_slices: Dict[str, slice]
+
+    def get_family(self, name: str):
+        """The keys, basis statuses and reduced costs of variable family ``name``."""
+        sl = self.var_slices[name]
+        return self.var_keys[name], self.vbasis[sl], None if self.rc is None else self.rc[sl]
+
+    def get_group(self, name: str):
+        """The keys, basis statuses and duals of constraint group ``name``."""
+        sl = self.cons_slices[name]
+        return self.cons_keys[name], self.cbasis[sl], None if self.pi is None else self.pi[sl]
+
+    def get_duals(self, name: str) -> Dict[Any, float]:
+        """Duals of constraint group ``name`` keyed as in ``self.cons``."""
+        keys, _, pi = self.get_group(name)
+        return dict(zip(keys, pi.tolist()))
+
+
+@dataclasses.dataclass
+class CutFlushStats(JSONSerialisableDataclass):
+    added: int = 0
+    dropped: int = 0
+
+
+@dataclasses.dataclass
+class HeuristicStats(JSONSerialisableDataclass):
+    points: int = 0
+    solutions: int = 0
+    injected: int = 0
+    accepted: int = 0
+    improved: int = 0
+    dropped_stale: int = 0
+    dropped_dominated: int = 0
+    errors: int = 0
+
+
+@dataclasses.dataclass
+class SeparatorStats(JSONSerialisableDataclass):
+    calls: int = 0
+    skipped: int = 0
+    cuts: int = 0
+    time: float = 0.0
+    interval: int = 1
+
+
+@dataclasses.dataclass
+class CutCacheStats(JSONSerialisableDataclass):
+    size: int = 0
+    memory: int = 0
+    added: int = 0
+    replaced: int = 0
+    evicted: int = 0
+    flushed: int = 0
+
+
+class VarLayout:
+    """
+    Flat layout of the annotated variable families of a :py:class:`BaseGurobiModel`.  The variables of all families are
+    stored contiguously in ``vars``, ``slices[name]`` gives the position of family ``name`` within ``vars`` and
+    ``keys[name]`` its keys (``None`` for lone variables).
+    """
+    __slots__ = ('vars', 'keys', 'slices', '_families', '_key_indices')
+
+    def __init__(self, model: 'BaseGurobiModel'):
+        self._key_indices = dict()
+        self.vars = []
+        self.keys = dict()
+        self.slices = dict()
+        for var_attr in model.__vars__:
+            start = len(self.vars)
+            if var_attr in model.__lonevars__:
+                self.vars.append(getattr(model, var_attr))
+                self.keys[var_attr] = None
+            else:
+                vardict = getattr(model, var_attr)
+                self.keys[var_attr] = list(vardict.keys())
+                self.vars.extend(vardict.values())
+            self.slices[var_attr] = slice(start, len(self.vars))
+        # hold references to the family objects themselves, so they cannot be freed and their ids reused
+        self._families = tuple((getattr(model, var_attr), self.slices[var_attr].stop - self.slices[var_attr].start)
+                               for var_attr in model.__vars__)
+
+    def is_current(self, model: 'BaseGurobiModel'):
+        """
+        Cheap check that the variable families of ``model`` have not been replaced or resized since this layout was
+        built.  In-place replacement of individual variables is not detected.
+        """
+        for var_attr, (family, size) in zip(model.__vars__, self._families):
+            obj = getattr(model, var_attr)
+            if obj is not family or (len(obj) if isinstance(obj, dict) else 1) != size:
+                return False
+        return True
+
+    def get_key_index(self, var_attr: str) -> 'KeyIndex':
+        """Shared key encoding of family ``var_attr``, built on first use."""
+        index = self._key_indices.get(var_attr)
+        if index is None:
+            index = self._key_indices[var_attr] = KeyIndex(self.keys[var_attr])
+        return index
+
+    def __len__(self):
+        return len(self.vars)
+
+
+class KeyIndex:
+    """The keys of a variable family and their positions, shared by all :py:class:`CompactVarValues` of the family."""
+    __slots__ = ('keys', 'positions')
+
+    def __init__(self, keys: List):
+        self.keys = keys
+        self.positions = {k: i for i, k in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class CompactVarValues(Mapping):
+    """
+    Read-only mapping from variable keys to solution values, stored as NumPy arrays over a shared :py:class:`KeyIndex`.
+    If ``eps`` is given, only entries with a value greater than ``eps`` are kept, as sorted positions (``index``) and
+    their values (``data``); otherwise ``index`` is ``None`` and ``data`` is dense.  Stored entries cost 12 bytes
+    each (8 if dense), so many historical solutions can be kept in memory.
+    """
+    __slots__ = ('key_index', 'index', 'data')
+
+    def __init__(self, key_index: KeyIndex, values: np.ndarray, eps=None):
+        self.key_index = key_index
+        if eps is None:
+            self.index = None
+            self.data = np.array(values, dtype=float)
+        else:
+            self.index = np.flatnonzero(values > eps).astype(np.int32)
+            self.data = values[self.index]
+
+    def _position(self, key):
+        pos = self.key_index.positions[key]
+        if self.index is None:
+            return pos
+        i = int(np.searchsorted(self.index, pos))
+        if i < len(self.index) and self.index[i] == pos:
+            return i
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        return float(self.data[self._position(key)])
+
+    def __contains__(self, key):
+        try:
+            self._position(key)
+        except KeyError:
+            return False
+        return True
+
+    def _iter_keys(self):
+        if self.index is None:
+            return iter(self.key_index.keys)
+        keys = self.key_index.keys
+        return (keys[i] for i in self.index.tolist())
+
+    def __iter__(self):
+        return self._iter_keys()
+
+    def __len__(self):
+        return len(self.data)
+
+    def items(self):
+        return zip(self._iter_keys(), self.data.tolist())
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (0 if self.index is None else self.index.nbytes)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)}/{len(self.key_index)} entries)"
+
+
+class CallbackProfiler:
+    """Records per-`where` timings and counts for a callback wrapped by :py:func:`_wrap_callback`."""
+
+    def __init__(self):
+        self.times = defaultdict(lambda: array('d'))
+        self.cuts = defaultdict(int)
+        self.lazy_constraints = defaultdict(int)
+        self.solutions = defaultdict(int)
+        self.where = None
+        self.solution_pending = False
+
+    def wrap(self, callback):
+        def wrapped_callback(model: Model, where):
+            self.where = where
+            start = time.perf_counter()
+            try:
+                return callback(model._parent, where)
+            finally:
+                self.times[where].append(time.perf_counter() - start)
+                if self.solution_pending:
+                    self.solutions[where] += 1
+                    self.solution_pending = False
+
+        return wrapped_callback
+
+    def get_profile(self) -> CallbackProfile:
+        fields = defaultdict(dict)
+        for where, times in sorted(self.times.items()):
+            name = CALLBACK_WHERE_NAMES.get(where, str(where))
+            times = np.frombuffer(times, dtype=float)
+            fields['calls'][name] = len(times)
+            fields['total_time'][name] = float(times.sum())
+            fields['min_time'][name] = float(times.min())
+            fields['max_time'][name] = float(times.max())
+            for q in (50, 90, 99):
+                fields[f'p{q}_time'][name] = float(np.percentile(times, q))
+            fields['cuts'][name] = self.cuts[where]
+            fields['lazy_constraints'][name] = self.lazy_constraints[where]
+            fields['solutions'][name] = self.solutions[where]
+        return CallbackProfile(**{f.name: fields[f.name] for f in dataclasses.fields(CallbackProfile)})
+
+
+def _wrap_callback(callback, profiler: CallbackProfiler = None):
+    if profiler is not None:
+        return profiler.wrap(callback)
+
     def wrapped_callback(model: Model, where):
         return callback(model._parent, where)
 
     return wrapped_callback
 
 
-def pprint_constraint(cons: Constr, model: Model, eps=EPS):
+class SolveTraceRecorder:
+    """
+    Records the progress of a MIP solve (incumbent, best bound, gap, node, iteration and solution counts) from the MIP,
+    MIPSOL and MIPNODE callbacks into a preallocated ring buffer holding the last ``capacity`` samples.  Samples are
+    taken at most every ``interval`` seconds of solver runtime, except that every new incumbent is recorded if
+    ``record_incumbents`` is True.  Pass the recorder to :py:meth:`ModelWrapper.optimize`; afterwards the trace and the
+    final :py:class:`GurobiModelInformation` can be written to a compressed columnar ``.npz`` file with
+    :py:meth:`to_file`.
+    """
+    COLUMNS = (('time', float), ('where', np.int8), ('obj_best', float), ('obj_bound', float), ('gap', float),
+               ('node_count', float), ('iter_count', float), ('sol_count', np.int32))
+
+    def __init__(self, interval: float = 0.1, capacity: int = 10000, record_incumbents=True):
+        self.interval = interval
+        self.capacity = capacity
+        self.record_incumbents = record_incumbents
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS}
+        self.info: GurobiModelInformation = None
+        self.reset()
+
+    def reset(self):
+        self.num_samples = 0
+        self.info = None
+        self._last_time = -np.inf
+        self._sense = None
+
+    def wrap(self, callback=None):
+        """Wrap a raw solver callback ``callback(model, where)`` (or ``None``) so that progress is recorded first."""
+        def wrapped_callback(model: Model, where):
+            if where == GRB.Callback.MIP or where == GRB.Callback.MIPNODE or where == GRB.Callback.MIPSOL:
+                self.sample(model, where)
+            if callback is not None:
+                return callback(model, where)
+
+        return wrapped_callback
+
+    def sample(self, model: Model, where):
+        runtime = model.cbGet(GRB.Callback.RUNTIME)
+        if where == GRB.Callback.MIPSOL:
+            if not (self.record_incumbents or runtime - self._last_time >= self.interval):
+                return
+            # OBJBST and SOLCNT describe the state before the new solution is taken into account
+            if self._sense is None:
+                self._sense = model.getAttr("ModelSense")
+            best, obj = model.cbGet(GRB.Callback.MIPSOL_OBJBST), model.cbGet(GRB.Callback.MIPSOL_OBJ)
+            if self._sense * (obj - best) < 0:
+                best = obj
+            bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+            nodes, sols = model.cbGet(GRB.Callback.MIPSOL_NODCNT), model.cbGet(GRB.Callback.MIPSOL_SOLCNT) + 1
+            iters = np.nan
+        elif runtime - self._last_time < self.interval:
+            return
+        elif where == GRB.Callback.MIP:
+            best, bound = model.cbGet(GRB.Callback.MIP_OBJBST), model.cbGet(GRB.Callback.MIP_OBJBND)
+            nodes, sols = model.cbGet(GRB.Callback.MIP_NODCNT), model.cbGet(GRB.Callback.MIP_SOLCNT)
+            iters = model.cbGet(GRB.Callback.MIP_ITRCNT)
+        else:
+            best, bound = model.cbGet(GRB.Callback.MIPNODE_OBJBST), model.cbGet(GRB.Callback.MIPNODE_OBJBND)
+            nodes, sols = model.cbGet(GRB.Callback.MIPNODE_NODCNT), model.cbGet(GRB.Callback.MIPNODE_SOLCNT)
+            iters = np.nan
+
+        if sols > 0 and abs(best) < GRB.INFINITY:
+            gap = abs(best - bound) / abs(best) if best != 0 else (0. if bound == 0 else np.inf)
+        else:
+            gap = np.inf
+
+        i = self.num_samples % self.capacity
+        cols = self.columns
+        cols['time'][i] = runtime
+        cols['where'][i] = where
+        cols['obj_best'][i] = best
+        cols['obj_bound'][i] = bound
+        cols['gap'][i] = gap
+        cols['node_count'][i] = nodes
+        cols['iter_count'][i] = iters
+        cols['sol_count'][i] = sols
+        self.num_samples += 1
+        self._last_time = runtime
+
+    def finish(self, model: 'ModelWrapper'):
+        """Capture the final model information, called by :py:meth:`ModelWrapper.optimize` after solving."""
+        self.info = _get_model_information(model._get_attr)
+
+    @property
+    def num_dropped(self):
+        """Number of samples overwritten because the ring buffer was full."""
+        return max(0, self.num_samples - self.capacity)
+
+    def get_trace(self) -> Dict[str, np.ndarray]:
+        """The recorded samples in chronological order, as a dictionary of columns."""
+        n = min(self.num_samples, self.capacity)
+        start = self.num_samples % self.capacity if self.num_samples > self.capacity else 0
+        order = (np.arange(n) + start) % self.capacity
+        return {name: col[order] for name, col in self.columns.items()}
+
+    def to_file(self, filename):
+        info = json.dumps(dataclasses.asdict(self.info)) if self.info is not None else ''
+        np.savez_compressed(filename, info=np.array(info), num_dropped=np.array(self.num_dropped), **self.get_trace())
+
+    @staticmethod
+    def read_file(filename) -> Tuple[Dict[str, np.ndarray], GurobiModelInformation]:
+        """Read a trace written by :py:meth:`to_file`, returning the trace columns and final model information."""
+        with np.load(filename) as data:
+            trace = {name: data[name] for name, _ in SolveTraceRecorder.COLUMNS}
+            info = str(data['info'])
+        info = GurobiModelInformation(**json.loads(info)) if info else None
+        return trace, info
+
+
+class HeuristicRunner:
+    """
+    Runs a primal heuristic in a background thread alongside the solver.  Pass the runner to
+    :py:meth:`ModelWrapper.optimize` of a :py:class:`BaseGurobiModel`.
+
+    Every new incumbent (MIPSOL) and, if ``feed_relaxations`` is True, optimal node relaxations (MIPNODE, only while
+    the heuristic is idle) are bulk-queried as in :py:meth:`BaseGurobiModel.get_var_value_arrays` and handed to
+    ``heuristic(values, is_incumbent)``, where ``values`` maps each family name to a ``{key: value}`` dictionary (a
+    float for lone variables).  Only the latest point is kept if the heuristic is busy.  The heuristic returns
+    ``None`` or a solution in the same format; missing entries are left for the solver to complete and count as zero
+    in the objective estimate.
+
+    Solutions are queued and injected with ``cbSetSolution``/``cbUseSolution`` at the next MIPNODE callback.  A
+    solution is dropped as stale if more than ``max_staleness`` new incumbents were found since the point it was
+    computed from, and as dominated if its objective is not better than the incumbent (or another queued solution).
+    Counts are kept in ``stats``.  An exception raised by the heuristic is re-raised after the solve.
+
+    After the solve, :py:meth:`stop` waits at most ``join_timeout`` seconds (``None`` waits indefinitely) for a call
+    to ``heuristic`` in progress to return.  Long-running heuristics should poll :py:attr:`stopping` and return
+    early.  A heuristic still running after the timeout is abandoned: the thread is a daemon, and its result and any
+    exception it raises are discarded.
+    """
+
+    def __init__(self, heuristic: Callable[[Dict[str, Any], bool], Union[Dict[str, Any], None]],
+                 feed_relaxations=True, max_staleness=1, eps=EPS, join_timeout=1.0):
+        self.heuristic = heuristic
+        self.feed_relaxations = feed_relaxations
+        self.max_staleness = max_staleness
+        self.eps = eps
+        self.join_timeout = join_timeout
+        self.stats = HeuristicStats()
+        self.exception = None
+        self._thread = None
+
+    def start(self, model: 'BaseGurobiModel'):
+        """Start the heuristic thread, called by :py:meth:`ModelWrapper.optimize` before solving."""
+        self.stats = HeuristicStats()
+        self.exception = None
+        model.update()
+        layout = model.get_var_layout()
+        self._layout = layout
+        self._obj = np.fromiter(model.model.getAttr("Obj", layout.vars), dtype=float, count=len(layout))
+        self._obj_con = model.model.getAttr("ObjCon")
+        self._sense = model.model.getAttr("ModelSense")
+        self._incumbent = GRB.INFINITY
+        self._generation = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stop = threading.Event()
+        self._inbox = queue.Queue(maxsize=1)
+        self._outbox = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(self._stop, self._inbox, self._outbox), daemon=True)
+        self._thread.start()
+
+    @property
+    def stopping(self) -> bool:
+        """True once the solve has finished (or the heuristic failed); the heuristic may poll this to return early."""
+        return self._thread is None or self._stop.is_set()
+
+    def stop(self):
+        """
+        Stop the heuristic thread, called by :py:meth:`ModelWrapper.optimize` after solving.  Blocks for at most
+        ``join_timeout`` seconds.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(self.join_timeout)
+        self._thread = None
+        if self.exception is not None:
+            raise self.exception
+
+    def _post(self, arrays, is_incumbent: bool):
+        try:
+            self._inbox.get_nowait()
+        except queue.Empty:
+            pass
+        self._inbox.put_nowait((arrays, is_incumbent, self._generation))
+        self.stats.points += 1
+
+    def _run(self, stop: threading.Event, inbox: queue.Queue, outbox: queue.Queue):
+        # The events and queues of this run are passed in, so a thread abandoned by stop() cannot touch a later run.
+        while not stop.is_set():
+            try:
+                arrays, is_incumbent, generation = inbox.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            self._idle.clear()
+            try:
+                values = {var_attr: float(vals[0]) if keys is None else dict(zip(keys, vals.tolist()))
+                          for var_attr, (keys, vals) in arrays.items()}
+                solution = self.heuristic(values, is_incumbent)
+                if solution is not None and not stop.is_set():
+                    outbox.put(self._encode(solution) + (generation,))
+            except Exception as e:
+                if not stop.is_set():
+                    self.stats.errors += 1
+                    self.exception = e
+                    stop.set()
+            finally:
+                self._idle.set()
+
+    def _encode(self, solution: Dict[str, Any]):
+        """Variables, values and objective estimate of a heuristic solution."""
+        layout = self._layout
+        positions = []
+        vals = []
+        for var_attr, sol in solution.items():
+            start = layout.slices[var_attr].start
+            if layout.keys[var_attr] is None:
+                positions.append(start)
+                vals.append(float(sol))
+            else:
+                index = layout.get_key_index(var_attr).positions
+                positions.extend(start + index[k] for k in sol.keys())
+                vals.extend(sol.values())
+        positions = np.array(positions, dtype=np.int64)
+        vals = np.array(vals, dtype=float)
+        obj = self._obj_con + float(self._obj[positions] @ vals)
+        return [layout.vars[i] for i in positions.tolist()], vals.tolist(), obj
+
+    def _improves(self, obj, than):
+        return self._sense * (obj - than) < -self.eps
+
+    def wrap(self, callback=None):
+        """Wrap a raw solver callback ``callback(model, where)`` (or ``None``) to feed and inject heuristics."""
+        def wrapped_callback(model: Model, where):
+            if where == GRB.Callback.MIPSOL:
+                self._on_incumbent(model._parent, model.cbGet(GRB.Callback.MIPSOL_OBJ))
+            elif where == GRB.Callback.MIPNODE:
+                self._on_node(model._parent)
+            if callback is not None:
+                return callback(model, where)
+
+        return wrapped_callback
+
+    def _on_incumbent(self, parent: 'BaseGurobiModel', obj):
+        if self._incumbent == GRB.INFINITY or self._improves(obj, self._incumbent):
+            self._incumbent = obj
+            self._generation += 1
+            self._post(parent.get_var_value_arrays(where=GRB.Callback.MIPSOL), True)
+
+    def _on_node(self, parent: 'BaseGurobiModel'):
+        if parent.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+            return
+        best = None
+        while True:
+            try:
+                vars, vals, obj, generation = self._outbox.get_nowait()
+            except queue.Empty:
+                break
+            self.stats.solutions += 1
+            if self._generation - generation > self.max_staleness:
+                self.stats.dropped_stale += 1
+            elif self._incumbent != GRB.INFINITY and not self._improves(obj, self._incumbent):
+                self.stats.dropped_dominated += 1
+            elif best is None or self._improves(obj, best[2]):
+                if best is not None:
+                    self.stats.dropped_dominated += 1
+                best = (vars, vals, obj)
+            else:
+                self.stats.dropped_dominated += 1
+
+        if best is not None:
+            parent.cbSetSolution(best[0], best[1])
+            obj = parent.cbUseSolution()
+            self.stats.injected += 1
+            if abs(obj) < GRB.INFINITY:
+                self.stats.accepted += 1
+                if self._incumbent == GRB.INFINITY or self._improves(obj, self._incumbent):
+                    self.stats.improved += 1
+        elif self.feed_relaxations and self._idle.is_set() and self._inbox.empty():
+            self._post(parent.get_var_value_arrays(where=GRB.Callback.MIPNODE), False)
+
+
+class _Separator:
+    __slots__ = ('name', 'func', 'where', 'budget', 'max_nodes', 'lazy', 'stats', 'last_node', 'last_found')
+
+    def __init__(self, name, func, where, budget, max_nodes, lazy):
+        self.name = name
+        self.func = func
+        self.where = where
+        self.budget = budget
+        self.max_nodes = max_nodes
+        self.lazy = lazy
+        self.stats = SeparatorStats()
+        self.last_node = -np.inf
+        self.last_found = False
+
+    @property
+    def rate(self):
+        """Cuts found per second of separation time (infinite before the first timed call)."""
+        if self.stats.time <= 0:
+            return np.inf
+        return self.stats.cuts / self.stats.time
+
+
+class SeparationScheduler:
+    """
+    Decides per callback which of the registered separation routines to run, and records per-separator statistics.
+    Use the scheduler as (or call it from) the callback of :py:meth:`ModelWrapper.optimize` of a
+    :py:class:`BaseGurobiModel`; cuts and lazy constraints added by a separator through ``cbCut``/``cbLazy`` are counted
+    automatically.
+
+    Separators are run at MIPNODE callbacks with an optimal relaxation and at MIPSOL callbacks, most effective (cuts
+    per second) first.  A separator is skipped at a node if it has used more than ``budget`` of the solver runtime so
+    far (not at the root), if the node count exceeds its ``max_nodes``, or if fewer than ``interval`` nodes were
+    processed since it last ran.  The interval doubles (up to ``max_interval``) each time the separator finds nothing
+    and is reset to 1 when it finds a cut.  Repeated callbacks at the node where a separator last ran (cut rounds)
+    run it again as long as its previous round found a cut.  Separators also stop being run once all separators
+    together have used more than ``max_time_fraction`` of the runtime, or ``max_callback_time`` seconds have been
+    spent in the current callback.
+    Separators registered with ``lazy=True`` are never skipped, since lazy constraints must see every new incumbent.
+    Solver node depth is not available in callbacks, so the node count is used instead.  Call :py:meth:`reset`
+    between solves.
+
+    If ``skip_seen_incumbents`` is True, MIPSOL callbacks first call :py:meth:`BaseGurobiModel.update_incumbent`, and
+    all separators except lazy ones are skipped for incumbents already seen in this solve.  Separators can then use
+    the ``<name>v`` values and ``changed_var_keys`` of the model.
+    """
+
+    def __init__(self, max_time_fraction=0.5, max_callback_time: float = None, max_interval=64,
+                 skip_seen_incumbents=True):
+        self.skip_seen_incumbents = skip_seen_incumbents
+        self.max_time_fraction = max_time_fraction
+        self.max_callback_time = max_callback_time
+        self.max_interval = max_interval
+        self.separators: Dict[str, _Separator] = OrderedDict()
+        self.total_time = 0.
+
+    def register(self, name: str, separator: Callable[['BaseGurobiModel', int], Any], where=GRB.Callback.MIPNODE,
+                 budget: float = None, max_nodes: int = None, lazy=False):
+        """
+        Register ``separator(model, where)`` under ``name``, to be run at the callbacks in ``where`` (a single code or
+        a collection of them).
+        """
+        if name in self.separators:
+            raise ValueError(f"separator `{name}` is already registered")
+        where = frozenset((where,) if isinstance(where, int) else where)
+        self.separators[name] = _Separator(name, separator, where, budget, max_nodes, lazy)
+
+    def reset(self):
+        self.total_time = 0.
+        for sep in self.separators.values():
+            sep.stats = SeparatorStats()
+            sep.last_node = -np.inf
+            sep.last_found = False
+
+    def get_stats(self) -> Dict[str, SeparatorStats]:
+        return {name: sep.stats for name, sep in self.separators.items()}
+
+    def _skip(self, sep: _Separator, node, runtime, callback_time):
+        if sep.lazy:
+            return False
+        if self.max_callback_time is not None and callback_time >= self.max_callback_time:
+            return True
+        if node > 0 and self.total_time > self.max_time_fraction * runtime:
+            return True
+        if node > 0 and sep.budget is not None and sep.stats.time > sep.budget * runtime:
+            return True
+        if sep.max_nodes is not None and node > sep.max_nodes:
+            return True
+        if node == sep.last_node:
+            return not sep.last_found
+        return node - sep.last_node < sep.stats.interval
+
+    def __call__(self, model: 'BaseGurobiModel', where):
+        if where == GRB.Callback.MIPNODE:
+            if model.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+                return
+            node = model.cbGet(GRB.Callback.MIPNODE_NODCNT)
+        elif where == GRB.Callback.MIPSOL:
+            node = model.cbGet(GRB.Callback.MIPSOL_NODCNT)
+        else:
+            return
+        separators = [sep for sep in self.separators.values() if where in sep.where]
+        if len(separators) == 0:
+            return
+        seen = where == GRB.Callback.MIPSOL and self.skip_seen_incumbents and not model.update_incumbent()
+        separators.sort(key=lambda sep: (not sep.lazy, -sep.rate))
+        runtime = model.cbGet(GRB.Callback.RUNTIME)
+        start = time.perf_counter()
+        for sep in separators:
+            stats = sep.stats
+            if (seen and not sep.lazy) or self._skip(sep, node, runtime, time.perf_counter() - start):
+                stats.skipped += 1
+                continue
+            cuts = stats.cuts
+            model._separator_stats = stats
+            t = time.perf_counter()
+            try:
+                sep.func(model, where)
+            finally:
+                model._separator_stats = None
+                t = time.perf_counter() - t
+            stats.calls += 1
+            stats.time += t
+            self.total_time += t
+            sep.last_node = node
+            sep.last_found = stats.cuts > cuts
+            if sep.last_found:
+                stats.interval = 1
+            else:
+                stats.interval = min(2 * stats.interval, self.max_interval)
+
+
+def _tuplify(obj):
+    """Undo the conversion of tuples to lists by JSON."""
+    if isinstance(obj, list):
+        return tuple(map(_tuplify, obj))
+    return obj
+
+
+def _hash_keys(keys) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for k in sorted(map(repr, keys)):
+        h.update(k.encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class WarmStartStore:
+    """
+    On-disk store of MIP incumbents, one lzma-compressed JSON file per model fingerprint and parameter string (see
+    ``oru.slurm.Experiment.parameter_string``).  Incumbents are stored sparsely per annotated variable family, see
+    :py:meth:`BaseGurobiModel.save_warm_start` and :py:meth:`BaseGurobiModel.load_warm_start`.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, fingerprint: str, parameter_string: str) -> Path:
+        return self.directory / f"{fingerprint}-{parameter_string}.json.xz"
+
+    def read(self, fingerprint: str, parameter_string: str):
+        path = self.path(fingerprint, parameter_string)
+        if not path.exists():
+            return None
+        with lzma.open(path, 'rt') as fp:
+            return json.load(fp)
+
+    def write(self, fingerprint: str, parameter_string: str, data):
+        path = self.path(fingerprint, parameter_string)
+        tmp_path = path.with_suffix('.tmp')
+        with lzma.open(tmp_path, 'wt') as fp:
+            json.dump(data, fp)
+        tmp_path.replace(path)
+
+
+class ModelBuildCache:
+    """
+    On-disk cache of fully built models, keyed by a hash of the instance inputs and build parameters (see
+    :py:meth:`make_key`).  Each entry consists of the solver model file, its non-default parameters and the
+    mapping from tuple keys to variable and constraint indices for every annotated variable family and every
+    ``self.cons`` group, see :py:meth:`BaseGurobiModel.save_build_cache` and
+    :py:meth:`BaseGurobiModel.load_build_cache`.
+    """
+
+    def __init__(self, directory, model_format='mps'):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model_format = model_format
+
+    @staticmethod
+    def make_key(*inputs, **parameters) -> str:
+        """Hash JSON-serialisable instance inputs and build parameters into a filesystem friendly key."""
+        s = json.dumps([inputs, parameters], sort_keys=True, default=str)
+        return hashlib.blake2b(s.encode(), digest_size=8).hexdigest()
+
+    def model_path(self, key: str) -> Path:
+        return self.directory / f"{key}.{self.model_format}"
+
+    def params_path(self, key: str) -> Path:
+        return self.directory / f"{key}.prm"
+
+    def layout_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json.xz"
+
+    def __contains__(self, key: str):
+        # the layout file is written last
+        return self.layout_path(key).exists()
+
+
+class ColumnPool:
+    """
+    Inactive columns of a column generation master, stored as constraint references ``(group, key)`` (into
+    ``self.cons``; ``key`` is ``None`` for single constraints), coefficient arrays, objective coefficient and bounds,
+    per variable family and key.  See :py:meth:`BaseGurobiModel.deactivate_columns` and
+    :py:meth:`BaseGurobiModel.reprice_column_pool`.
+    """
+
+    def __init__(self):
+        self._columns: Dict[str, Dict[Any, Tuple]] = defaultdict(dict)
+
+    def add(self, family: str, key, column: Mapping[Tuple[str, Any], float], obj=0.0, lb=0.0, ub=GRB.INFINITY):
+        self._columns[family][key] = (tuple(column.keys()), np.fromiter(column.values(), dtype=float,
+                                                                        count=len(column)), obj, lb, ub)
+
+    def pop(self, family: str, keys) -> Dict[Any, Tuple]:
+        columns = self._columns[family]
+        return {k: columns.pop(k) for k in keys}
+
+    def items(self, family: str):
+        return self._columns[family].items()
+
+    def get_sizes(self) -> Dict[str, int]:
+        return {family: len(columns) for family, columns in self._columns.items() if len(columns) > 0}
+
+    def __len__(self):
+        return sum(map(len, self._columns.values()))
+
+
+def _format_key(name, key):
+    if key is None:
+        return name
+    elif isinstance(key, tuple):
+        return f"{name}[{','.join(map(str, key))}]"
+    else:
+        return f"{name}[{key}]"
+
+
+def _format_row(row: LinExpr, sense: str, rhs: float, model: Model, eps=EPS, var_names: Callable[[Var], str] = None):
+    n = row.size()
+    vars = [row.getVar(i) for i in range(n)]
+    if var_names is None:
+        names = model.getAttr("VarName", vars)
+    else:
+        names = list(map(var_names, vars))
     lhs = ''
-    for var in model.getVars():
-        a = model.getCoeff(cons, var)
+    for i, name in enumerate(names):
+        a = row.getCoeff(i)
         if abs(a) > eps:
             if a < 0:
                 sgn = '-'
@@ -111,125 +991,481 @@ def pprint_constraint(cons: Constr, model: Model, eps=EPS):
                 a = ''
             else:
                 a = f'{a:.4g}'
-            lhs += f' {sgn} {a}{var.VarName}'
+            lhs += f' {sgn} {a}{name}'
+
+    return ' '.join([lhs.strip().rstrip('+ '), sense, str(rhs)])
+
+
+def format_constraint(cons: Constr, model: Model, eps=EPS, var_names: Callable[[Var], str] = None) -> str:
+    """
+    Format a linear constraint as a string, using only its nonzero coefficients.  Variables are named by their
+    ``VarName`` unless ``var_names`` is given, which should map a variable to its display name.
+    """
+    return _format_row(model.getRow(cons), cons.Sense, cons.RHS, model, eps, var_names)
+
+
+def pprint_constraint(cons: Constr, model: Model, eps=EPS, var_names: Callable[[Var], str] = None, file=None):
+    print(format_constraint(cons, model, eps, var_names), file=file)
+
+
+def _normalise_cut(cut: TempConstr, eps=1e-9):
+    """
+    Normalise a linear ``TempConstr`` into a sparse ``(indices, coeffs, sense, rhs)`` signature: terms are merged and
+    sorted by variable index, ``>=`` constraints are flipped to ``<=`` and the row is scaled so the largest absolute
+    coefficient is 1 (equality rows additionally have a positive leading coefficient).  Returns the normalised row,
+    the signed factor ``scale`` and the original sense: the (merged) original row is ``scale * coeffs``, the
+    original sense and ``scale * rhs``.
+    """
+    expr = LinExpr(cut._lhs)
+    expr.add(LinExpr(cut._rhs), -1.0)
+    n = expr.size()
+    indices = np.fromiter((expr.getVar(i).index for i in range(n)), dtype=np.int64, count=n)
+    coeffs = np.fromiter((expr.getCoeff(i) for i in range(n)), dtype=float, count=n)
+    rhs = -expr.getConstant()
+    indices, inverse = np.unique(indices, return_inverse=True)
+    coeffs = np.bincount(inverse, weights=coeffs, minlength=len(indices))
+    nz = np.abs(coeffs) > eps
+    indices, coeffs = indices[nz], coeffs[nz]
+    original_sense = sense = cut._sense
+    flip = 1.
+    if sense == GRB.GREATER_EQUAL:
+        sense = GRB.LESS_EQUAL
+        coeffs, rhs = -coeffs, -rhs
+        flip = -1.
+    scale = 1.
+    if len(coeffs) > 0:
+        scale = np.abs(coeffs).max()
+        if sense == GRB.EQUAL and coeffs[0] < 0:
+            scale = -scale
+        coeffs, rhs = coeffs / scale, rhs / scale
+    return (indices, coeffs, sense, rhs), flip * float(scale), original_sense
+
+
+def _cut_signature(indices: np.ndarray, coeffs: np.ndarray, sense: str, rhs: float, decimals=9):
+    sig = (sense, indices.tobytes(), np.round(coeffs, decimals).tobytes())
+    if sense == GRB.EQUAL:
+        sig += (round(rhs, decimals),)
+    return sig
+
+
+def _dedup_cuts(cuts):
+    """
+    Drop duplicate and dominated cuts from an iterable of ``(key, (indices, coeffs, sense, rhs))`` pairs, where the
+    second element is a normalised cut (see :py:func:`_normalise_cut`).  Of several ``<=`` cuts which differ only in
+    their right-hand side, the tightest is kept.  Returns the surviving pairs, in order of first appearance, and the
+    number of cuts dropped.
+    """
+    position = dict()
+    survivors = []
+    dropped = 0
+    for key, row in cuts:
+        sig = _cut_signature(*row)
+        pos = position.get(sig)
+        if pos is None:
+            position[sig] = len(survivors)
+            survivors.append((key, row))
+        else:
+            dropped += 1
+            if row[2] == GRB.LESS_EQUAL and row[3] < survivors[pos][1][3]:
+                survivors[pos] = (key, row)
+    return survivors, dropped
 
-    print(' '.join([lhs.rstrip().rstrip('+ '), cons.sense, str(cons.RHS)]))
+
+class CachedCut:
+    """
+    A cut stored in compact form: sorted variable indices, normalised coefficients, sense and right-hand side (see
+    :py:func:`_normalise_cut`), plus the scale factor and sense needed to recover the cut as it was added.
+    """
+    __slots__ = ('indices', 'coeffs', 'sense', 'rhs', 'scale', 'original_sense', 'created', 'last_used', 'hits')
+    OVERHEAD = 256  # rough per-cut bytes for the entry object, arrays headers and dictionary slot
+
+    def __init__(self, row: Tuple[np.ndarray, np.ndarray, str, float], scale: float, original_sense: str, clock: int):
+        indices, coeffs, sense, rhs = row
+        self.indices = indices.astype(np.int32)
+        self.coeffs = coeffs
+        self.sense = sense
+        self.rhs = rhs
+        self.scale = scale
+        self.original_sense = original_sense
+        self.created = clock
+        self.last_used = clock
+        self.hits = 0
+
+    @property
+    def row(self):
+        """The normalised row, used to detect duplicates."""
+        return self.indices, self.coeffs, self.sense, self.rhs
+
+    @property
+    def original_row(self):
+        """The row with the coefficients, sense and right-hand side of the cut as it was added."""
+        return self.indices, self.coeffs * self.scale, self.original_sense, self.rhs * self.scale
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.coeffs.nbytes + self.OVERHEAD
+
+
+CUT_EVICTION_POLICIES = {
+    'lru': lambda cut: cut.last_used,
+    'age': lambda cut: cut.created,
+    'activity': lambda cut: (cut.hits, cut.last_used),
+}
+
+
+class CutCache:
+    """
+    A single named cache of a :py:class:`CutPool`.  Cuts added with a key replace earlier cuts with the same key,
+    cuts added without a key are kept in insertion order.
+    """
+
+    def __init__(self, pool: 'CutPool', keyed: bool):
+        self.pool = pool
+        self.keyed = keyed
+        self.stats = CutCacheStats()
+        self._cuts: Dict[Any, CachedCut] = OrderedDict()
+        self._next_key = 0
+
+    def add(self, cut: TempConstr, key=None):
+        if key is None:
+            key = self._next_key
+            self._next_key += 1
+        entry = CachedCut(*_normalise_cut(cut), clock=self.pool.tick())
+        old = self._cuts.pop(key, None)
+        if old is not None:
+            entry.hits = old.hits + 1
+            self.stats.memory -= old.nbytes
+            self.stats.replaced += 1
+        self._cuts[key] = entry
+        self.stats.added += 1
+        self.stats.memory += entry.nbytes
+        self.stats.size = len(self._cuts)
+        self._enforce_limits()
+
+    def _enforce_limits(self):
+        max_size, max_memory = self.pool.max_size, self.pool.max_memory
+        over_size = max_size is not None and len(self._cuts) > max_size
+        over_memory = max_memory is not None and self.stats.memory > max_memory
+        if not (over_size or over_memory):
+            return
+        # evict down to a fraction of the limit so eviction cost is amortised over many insertions
+        n_evict = 0
+        if over_size:
+            n_evict = len(self._cuts) - int(max_size * self.pool.evict_to)
+        if over_memory:
+            avg_nbytes = self.stats.memory / len(self._cuts)
+            n_evict = max(n_evict, int((self.stats.memory - max_memory * self.pool.evict_to) / avg_nbytes) + 1)
+        score = self.pool.policy
+        victims = heapq.nsmallest(min(n_evict, len(self._cuts)), self._cuts.items(), key=lambda kv: score(kv[1]))
+        for key, entry in victims:
+            del self._cuts[key]
+            self.stats.memory -= entry.nbytes
+        self.stats.evicted += len(victims)
+        self.stats.size = len(self._cuts)
+
+    def record_activity(self, x: np.ndarray, tol=EPS, clock=None):
+        """
+        Count the cuts which are violated or binding at the point ``x``, which must be indexed by variable index.
+        Returns the number of such cuts.
+        """
+        if len(self._cuts) == 0:
+            return 0
+        entries = list(self._cuts.values())
+        n = len(entries)
+        lengths = np.fromiter((len(e.indices) for e in entries), dtype=np.int64, count=n)
+        indices = np.concatenate([e.indices for e in entries])
+        coeffs = np.concatenate([e.coeffs for e in entries])
+        lhs = np.bincount(np.repeat(np.arange(n), lengths), weights=coeffs * x[indices], minlength=n)
+        rhs = np.fromiter((e.rhs for e in entries), dtype=float, count=n)
+        active = (rhs - lhs) <= tol
+        active |= np.fromiter((e.sense == GRB.EQUAL for e in entries), dtype=bool, count=n)
+        if clock is None:
+            clock = self.pool.tick()
+        for entry in compress(entries, active):
+            entry.hits += 1
+            entry.last_used = clock
+        return int(active.sum())
+
+    def items(self):
+        return self._cuts.items()
+
+    def __len__(self):
+        return len(self._cuts)
+
+    def __iter__(self):
+        return iter(self._cuts)
+
+    def __getitem__(self, key) -> CachedCut:
+        return self._cuts[key]
+
+
+class CutPool(Mapping[str, CutCache]):
+    """
+    Compact, bounded storage for cuts added with ``cbCut``/``cbLazy(cache=...)``.  Each named cache holds at most
+    ``max_size`` cuts and approximately ``max_memory`` bytes (``None`` for no limit).  When a limit is exceeded, the
+    cuts with the lowest ``policy`` score are evicted until the cache is at ``evict_to`` times the limit.  ``policy``
+    is either one of ``'lru'`` (least recently added or active), ``'age'`` (oldest) or ``'activity'`` (fewest times
+    violated, binding or re-added), or a function mapping a :py:class:`CachedCut` to a sortable score.
+    """
+
+    def __init__(self, max_size: int = None, max_memory: int = None, policy: Union[str, Callable] = 'lru',
+                 evict_to: float = 0.9):
+        self.max_size = max_size
+        self.max_memory = max_memory
+        self.evict_to = evict_to
+        if isinstance(policy, str):
+            try:
+                policy = CUT_EVICTION_POLICIES[policy]
+            except KeyError:
+                raise ValueError(f"Unknown eviction policy `{policy}`, must be one of "
+                                 f"{', '.join(CUT_EVICTION_POLICIES)} or a callable") from None
+        self.policy = policy
+        self._caches: Dict[str, CutCache] = dict()
+        self._clock = 0
+
+    def tick(self):
+        self._clock += 1
+        return self._clock
+
+    def add(self, cache: str, cut: TempConstr, key=None):
+        if cache not in self._caches:
+            self._caches[cache] = CutCache(self, keyed=key is not None)
+        self._caches[cache].add(cut, key)
+
+    def record_activity(self, x: np.ndarray, tol=EPS):
+        """Update the activity counts of all cached cuts at the point ``x``, indexed by variable index."""
+        clock = self.tick()
+        return sum(c.record_activity(x, tol, clock) for c in self._caches.values())
+
+    @property
+    def size(self):
+        return sum(map(len, self._caches.values()))
+
+    @property
+    def stats(self) -> Dict[str, CutCacheStats]:
+        return {name: dataclasses.replace(c.stats) for name, c in self._caches.items()}
+
+    def clear(self):
+        """Remove all cuts, keeping the per-cache statistics."""
+        for cache in self._caches.values():
+            cache._cuts.clear()
+            cache.stats.size = 0
+            cache.stats.memory = 0
+
+    def __getitem__(self, cache: str) -> CutCache:
+        return self._caches[cache]
+
+    def __iter__(self):
+        return (name for name, c in self._caches.items() if len(c) > 0)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class EnvPool:
+    """
+    Per-process pool of started solver environments, one per distinct set of parameter settings.  Environments are
+    not carried across ``fork``: a child process starts with an empty pool.
+    """
+
+    def __init__(self):
+        self._envs: Dict[Tuple, Env] = dict()
+        self._pid = os.getpid()
+
+    def get(self, **params) -> Env:
+        """Return the environment with parameters ``params``, creating and starting it on first use."""
+        if self._pid != os.getpid():
+            self._envs = dict()
+            self._pid = os.getpid()
+        key = tuple(sorted(params.items()))
+        env = self._envs.get(key)
+        if env is None:
+            env = Env(empty=True)
+            for param, val in params.items():
+                env.setParam(param, val)
+            env.start()
+            self._envs[key] = env
+        return env
+
+    def dispose(self):
+        """Dispose of all pooled environments.  Models created from them must not be used afterwards."""
+        for env in self._envs.values():
+            env.dispose()
+        self._envs = dict()
+
+    def __len__(self):
+        return len(self._envs)
+
+
+ENV_POOL = EnvPool()
+
+
+def _race_worker(run: int, model_file: str, params_file: str, params: Dict[str, Any], stop, results):
+    """Entry point of a :py:meth:`BaseGurobiModel.race` worker process."""
+    try:
+        model = read(model_file)
+        model.read(params_file)
+        for param, val in params.items():
+            model.setParam(param, val)
+
+        def callback(m: Model, where):
+            if stop.is_set():
+                m.terminate()
+
+        model.optimize(callback)
+        sol_count = model.getAttr("SolCount")
+        if sol_count > 0:
+            x = np.fromiter(model.getAttr("X", model.getVars()), dtype=float)
+            obj_val = model.getAttr("ObjVal")
+        else:
+            x = None
+            obj_val = None
+        try:
+            obj_bound = model.getAttr("ObjBound")
+        except AttributeError:
+            obj_bound = None
+        results.put((run, model.getAttr("Status"), obj_val, obj_bound, model.getAttr("Runtime"), x))
+    except Exception:
+        results.put((run, None, None, None, None, None))
+        raise
+
+
+def _modifies_model(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._attr_snapshot = None
+        self._model_changes += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class ModelWrapper:
+    """
+    Thin wrapper around a solver ``Model``.  Model attribute properties (``ObjVal``, ``NodeCount``, ...) are served
+    from a snapshot of all model attributes, taken in one pass on first access and invalidated by any change to the
+    model made through the wrapper (adding or removing variables and constraints, ``setAttr``, ``setParam``,
+    ``update``, ``optimize``, ``reset``, ...).  Changes made directly to ``self.model`` should be followed by
+    :py:meth:`invalidate_attr_snapshot`.  During ``optimize`` (ie, inside callbacks) attributes are always queried
+    directly.
+
+    The model is created in ``env`` if given.  Otherwise, if the class sets ``env_params``, it is created in the
+    environment with those parameters drawn from :py:data:`ENV_POOL`, so parameters such as ``Threads`` and
+    ``OutputFlag`` are set (and the license checked out) once per process rather than once per model.
+    """
     model: Model
-
-    def __init__(self, name=""):
-        self.model = Model(name=name)
+    env: Env = None
+    env_params: ClassVar[Dict[str, Any]] = None
+    callback_profiler: CallbackProfiler = None
+    _attr_snapshot: Dict[str, Any] = None
+    _model_changes = 0
+    _optimizing = False
+
+    def __init__(self, name="", env: Env = None):
+        if env is None and self.env_params is not None:
+            env = ENV_POOL.get(**self.env_params)
+        self.env = env
+        self.model = Model(name=name, env=env)
         self.model._parent = self
 
+    def take_attr_snapshot(self) -> Dict[str, Any]:
+        """
+        Query all available model attributes exposed as properties in one pass and cache them.  Attributes which the
+        solver computes on demand (``Kappa``, ``KappaExact``, ``FarkasProof``) are left out and are queried and cached
+        individually on first access.
+        """
+        snapshot = dict()
+        getattr_ = self.model.getAttr
+        for attrname in SNAPSHOT_MODEL_ATTRS:
+            try:
+                snapshot[attrname] = getattr_(attrname)
+            except AttributeError:
+                pass
+        self._attr_snapshot = snapshot
+        return snapshot
+
+    def invalidate_attr_snapshot(self):
+        self._attr_snapshot = None
+
+    def _get_attr(self, attrname):
+        if self._optimizing:
+            try:
+                return self.model.getAttr(attrname)
+            except AttributeError:
+                return None
+        snapshot = self._attr_snapshot
+        if snapshot is None:
+            snapshot = self.take_attr_snapshot()
+        if attrname in ON_DEMAND_MODEL_ATTRS and attrname not in snapshot:
+            try:
+                snapshot[attrname] = self.model.getAttr(attrname)
+            except AttributeError:
+                snapshot[attrname] = None
+        return snapshot.get(attrname)
+
     @property
     def NumConstrs(self):
-        try:
-            return self.model.getAttr("NumConstrs")
-        except AttributeError:
-            return None
+        return self._get_attr("NumConstrs")
 
     @property
     def NumVars(self):
-        try:
-            return self.model.getAttr("NumVars")
-        except AttributeError:
-            return None
+        return self._get_attr("NumVars")
 
     @property
     def NumSOS(self):
-        try:
-            return self.model.getAttr("NumSOS")
-        except AttributeError:
-            return None
+        return self._get_attr("NumSOS")
 
     @property
     def NumQConstrs(self):
-        try:
-            return self.model.getAttr("NumQConstrs")
-        except AttributeError:
-            return None
+        return self._get_attr("NumQConstrs")
 
     @property
     def NumGenConstrs(self):
-        try:
-            return self.model.getAttr("NumGenConstrs")
-        except AttributeError:
-            return None
+        return self._get_attr("NumGenConstrs")
 
     @property
     def NumNZs(self):
-        try:
-            return self.model.getAttr("NumNZs")
-        except AttributeError:
-            return None
+        return self._get_attr("NumNZs")
 
     @property
     def DNumNZs(self):
-        try:
-            return self.model.getAttr("DNumNZs")
-        except AttributeError:
-            return None
+        return self._get_attr("DNumNZs")
 
     @property
     def NumQNZs(self):
-        try:
-            return self.model.getAttr("NumQNZs")
-        except AttributeError:
-            return None
+        return self._get_attr("NumQNZs")
 
     @property
     def NumQCNZs(self):
-        try:
-            return self.model.getAttr("NumQCNZs")
-        except AttributeError:
-            return None
+        return self._get_attr("NumQCNZs")
 
     @property
     def NumIntVars(self):
-        try:
-            return self.model.getAttr("NumIntVars")
-        except AttributeError:
-            return None
+        return self._get_attr("NumIntVars")
 
     @property
     def NumBinVars(self):
-        try:
-            return self.model.getAttr("NumBinVars")
-        except AttributeError:
-            return None
+        return self._get_attr("NumBinVars")
 
     @property
     def NumPWLObjVars(self):
-        try:
-            return self.model.getAttr("NumPWLObjVars")
-        except AttributeError:
-            return None
+        return self._get_attr("NumPWLObjVars")
 
     @property
     def ModelName(self):
-        try:
-            return self.model.getAttr("ModelName")
-        except AttributeError:
-            return None
+        return self._get_attr("ModelName")
 
     @property
     def ModelSense(self):
-        try:
-            return self.model.getAttr("ModelSense")
-        except AttributeError:
-            return None
+        return self._get_attr("ModelSense")
 
     @property
     def ObjCon(self):
-        try:
-            return self.model.getAttr("ObjCon")
-        except AttributeError:
-            return None
+        return self._get_attr("ObjCon")
 
     @ObjCon.setter
     def ObjCon(self, val: float):
+        self._attr_snapshot = None
         self.model.setAttr("ObjCon", val)
 
     @property
@@ -238,10 +1474,7 @@ class ModelWrapper:
         The objective value for the current solution. If the model was solved to optimality, then this attribute gives
         the optimal objective value.  Otherwise, ``None`` is returned.
         """
-        try:
-            return self.model.getAttr("ObjVal")
-        except AttributeError:
-            return None
+        return self._get_attr("ObjVal")
 
     @property
     def ObjBound(self):
@@ -255,10 +1488,7 @@ class ModelWrapper:
         tighter bound. For example, if the objective is known to take an integral value and the current best bound is
         1.5, ObjBound will return 2.0 while ObjBoundC will return 1.5.
         """
-        try:
-            return self.model.getAttr("ObjBound")
-        except AttributeError:
-            return None
+        return self._get_attr("ObjBound")
 
     @property
     def ObjBoundC(self):
@@ -272,281 +1502,166 @@ class ModelWrapper:
         to a tighter bound. For example, if the objective is known to take an integral value and the current best
         bound is 1.5, ObjBound will return 2.0 while ObjBoundC will return 1.5.
         """
-        try:
-            return self.model.getAttr("ObjBoundC")
-        except AttributeError:
-            return None
+        return self._get_attr("ObjBoundC")
 
     @property
     def PoolObjBound(self):
-        try:
-            return self.model.getAttr("PoolObjBound")
-        except AttributeError:
-            return None
+        return self._get_attr("PoolObjBound")
 
     @property
     def PoolObjVal(self):
-        try:
-            return self.model.getAttr("PoolObjVal")
-        except AttributeError:
-            return None
+        return self._get_attr("PoolObjVal")
 
     @property
     def MIPGap(self):
-        try:
-            return self.model.getAttr("MIPGap")
-        except AttributeError:
-            return None
+        return self._get_attr("MIPGap")
 
     @property
     def Runtime(self):
-        try:
-            return self.model.getAttr("Runtime")
-        except AttributeError:
-            return None
+        return self._get_attr("Runtime")
 
     @property
     def Status(self):
-        try:
-            return self.model.getAttr("Status")
-        except AttributeError:
-            return None
+        return self._get_attr("Status")
 
     @property
     def SolCount(self):
-        try:
-            return self.model.getAttr("SolCount")
-        except AttributeError:
-            return None
+        return self._get_attr("SolCount")
 
     @property
     def IterCount(self):
-        try:
-            return self.model.getAttr("IterCount")
-        except AttributeError:
-            return None
+        return self._get_attr("IterCount")
 
     @property
     def BarIterCount(self):
-        try:
-            return self.model.getAttr("BarIterCount")
-        except AttributeError:
-            return None
+        return self._get_attr("BarIterCount")
 
     @property
     def NodeCount(self):
-        try:
-            return self.model.getAttr("NodeCount")
-        except AttributeError:
-            return None
+        return self._get_attr("NodeCount")
 
     @property
     def IsMIP(self):
-        try:
-            return self.model.getAttr("IsMIP")
-        except AttributeError:
-            return None
+        return self._get_attr("IsMIP")
 
     @property
     def IsQP(self):
-        try:
-            return self.model.getAttr("IsQP")
-        except AttributeError:
-            return None
+        return self._get_attr("IsQP")
 
     @property
     def IsQCP(self):
-        try:
-            return self.model.getAttr("IsQCP")
-        except AttributeError:
-            return None
+        return self._get_attr("IsQCP")
 
     @property
     def IsMultiObj(self):
-        try:
-            return self.model.getAttr("IsMultiObj")
-        except AttributeError:
-            return None
+        return self._get_attr("IsMultiObj")
 
     @property
     def IISMinimal(self):
-        try:
-            return self.model.getAttr("IISMinimal")
-        except AttributeError:
-            return None
+        return self._get_attr("IISMinimal")
 
     @property
     def MaxCoeff(self):
-        try:
-            return self.model.getAttr("MaxCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxCoeff")
 
     @property
     def MinCoeff(self):
-        try:
-            return self.model.getAttr("MinCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MinCoeff")
 
     @property
     def MaxBound(self):
-        try:
-            return self.model.getAttr("MaxBound")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxBound")
 
     @property
     def MinBound(self):
-        try:
-            return self.model.getAttr("MinBound")
-        except AttributeError:
-            return None
+        return self._get_attr("MinBound")
 
     @property
     def MaxObjCoeff(self):
-        try:
-            return self.model.getAttr("MaxObjCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxObjCoeff")
 
     @property
     def MinObjCoeff(self):
-        try:
-            return self.model.getAttr("MinObjCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MinObjCoeff")
 
     @property
     def MaxRHS(self):
-        try:
-            return self.model.getAttr("MaxRHS")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxRHS")
 
     @property
     def MinRHS(self):
-        try:
-            return self.model.getAttr("MinRHS")
-        except AttributeError:
-            return None
+        return self._get_attr("MinRHS")
 
     @property
     def MaxQCCoeff(self):
-        try:
-            return self.model.getAttr("MaxQCCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxQCCoeff")
 
     @property
     def MinQCCoeff(self):
-        try:
-            return self.model.getAttr("MinQCCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MinQCCoeff")
 
     @property
     def MaxQCLCoeff(self):
-        try:
-            return self.model.getAttr("MaxQCLCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxQCLCoeff")
 
     @property
     def MinQCLCoeff(self):
-        try:
-            return self.model.getAttr("MinQCLCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MinQCLCoeff")
 
     @property
     def MaxQCRHS(self):
-        try:
-            return self.model.getAttr("MaxQCRHS")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxQCRHS")
 
     @property
     def MinQCRHS(self):
-        try:
-            return self.model.getAttr("MinQCRHS")
-        except AttributeError:
-            return None
+        return self._get_attr("MinQCRHS")
 
     @property
     def MaxQObjCoeff(self):
-        try:
-            return self.model.getAttr("MaxQObjCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MaxQObjCoeff")
 
     @property
     def MinQObjCoeff(self):
-        try:
-            return self.model.getAttr("MinQObjCoeff")
-        except AttributeError:
-            return None
+        return self._get_attr("MinQObjCoeff")
 
     @property
     def Kappa(self):
-        try:
-            return self.model.getAttr("Kappa")
-        except AttributeError:
-            return None
+        return self._get_attr("Kappa")
 
     @property
     def KappaExact(self):
-        try:
-            return self.model.getAttr("KappaExact")
-        except AttributeError:
-            return None
+        return self._get_attr("KappaExact")
 
     @property
     def FarkasProof(self):
-        try:
-            return self.model.getAttr("FarkasProof")
-        except AttributeError:
-            return None
+        return self._get_attr("FarkasProof")
 
     @property
     def TuneResultCount(self):
-        try:
-            return self.model.getAttr("TuneResultCount")
-        except AttributeError:
-            return None
+        return self._get_attr("TuneResultCount")
 
     @property
     def NumStart(self):
-        try:
-            return self.model.getAttr("NumStart")
-        except AttributeError:
-            return None
+        return self._get_attr("NumStart")
 
     @property
     def LicenseExpiration(self):
-        try:
-            return self.model.getAttr("LicenseExpiration")
-        except AttributeError:
-            return None
+        return self._get_attr("LicenseExpiration")
 
     @property
     def JobID(self):
-        try:
-            return self.model.getAttr("JobID")
-        except AttributeError:
-            return None
+        return self._get_attr("JobID")
 
     @property
     def Server(self):
-        try:
-            return self.model.getAttr("Server")
-        except AttributeError:
-            return None
+        return self._get_attr("Server")
 
+    @_modifies_model
     def addConstr(self, lhs, sense=None, rhs=None, name=""):
         """Add a constraint to a model. """
         return self.model.addConstr(lhs, sense, rhs, name)
 
+    @_modifies_model
     def addConstrs(self, generator, name=""):
         """
         Add multiple constraints to a model using a Python generator expression. Returns a Gurobi tupledict that
@@ -554,30 +1669,37 @@ class ModelWrapper:
         """
         return self.model.addConstrs(generator, name=name)
 
+    @_modifies_model
     def addGenConstrAbs(self, resvar, argvar, name=""):
         """Add a new general constraint of type GRB.GENCONSTR_ABS to a model."""
         return self.model.addGenConstrAbs(resvar, argvar, name)
 
+    @_modifies_model
     def addGenConstrAnd(self, resvar, vars, name=""):
         """Add a new general constraint of type GRB.GENCONSTR_AND to a model. """
         return self.model.addGenConstrAnd(resvar, vars, name)
 
+    @_modifies_model
     def addGenConstrIndicator(self, binvar, binval, lhs, sense=None, rhs=None, name=""):
         """Add a new general constraint of type GRB.GENCONSTR_INDICATOR to a model. """
         return self.model.addGenConstrIndicator(binvar, binval, lhs, sense, rhs, name)
 
+    @_modifies_model
     def addGenConstrMax(self, resvar, vars, constant=None, name=""):
         """Add a new general constraint of type GRB.GENCONSTR_MAX to a model."""
         return self.model.addGenConstrMax(resvar, vars, constant, name)
 
+    @_modifies_model
     def addGenConstrMin(self, resvar, vars, constant=None, name=""):
         """Add a new general constraint of type GRB.GENCONSTR_MIN to a model. """
         return self.model.addGenConstrMin(resvar, vars, constant, name)
 
+    @_modifies_model
     def addGenConstrOr(self, resvar, vars, name=""):
         """Add a new general constraint of type GRB.GENCONSTR_OR to a model. """
         return self.model.addGenConstrOr(resvar, vars, name)
 
+    @_modifies_model
     def addLConstr(self, lhs, sense=None, rhs=None, name=""):
         """
         Add a linear constraint to a model. This method is faster than addConstr()
@@ -585,6 +1707,16 @@ class ModelWrapper:
         """
         return self.model.addLConstr(lhs, sense, rhs, name)
 
+    @_modifies_model
+    def addMConstr(self, A, x, sense, b, name=""):
+        """
+        Add a set of linear constraints to the model using matrix semantics. The added constraints are
+        ``A @ x <sense> b``, where ``A`` is a (sparse) matrix, ``x`` is an MVar, a list of variables or ``None``
+        (for all variables in the model), and ``sense`` and ``b`` are arrays or scalars.
+        """
+        return self.model.addMConstr(A, x, sense, b, name)
+
+    @_modifies_model
     def addQConstr(self, lhs, sense=None, rhs=None, name=""):
         """
          Add a quadratic constraint to a model. Important note: the algorithms that Gurobi uses to solve quadratically
@@ -592,6 +1724,7 @@ class ModelWrapper:
         """
         return self.model.addQConstr(lhs, sense, rhs, name)
 
+    @_modifies_model
     def addRange(self, expr, lower, upper, name=""):
         """
          Add a range constraint to a model. A range constraint states that the value of the input expression must be
@@ -601,16 +1734,19 @@ class ModelWrapper:
         """
         return self.model.addRange(expr, lower, upper, name)
 
+    @_modifies_model
     def addSOS(self, type, vars, wts=None):
         """
         Add an SOS constraint to the model.
         """
         return self.model.addSOS(type, vars, wts)
 
+    @_modifies_model
     def addVar(self, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name="", column=None):
         """Add a decision variable to a model. """
         return self.model.addVar(lb, ub, obj, vtype, name, column)
 
+    @_modifies_model
     def addVars(self, *indexes, lb=0.0, ub=None, obj=0.0, vtype=None, name=""):
         """ Add multiple decision variables to a model. Returns a Gurobi tupledict object that contains the newly
         created variables. The keys for the tupledict are derived from the indices argument(s). """
@@ -628,6 +1764,8 @@ class ModelWrapper:
         shuts off a few presolve reductions that sometimes prevent cuts on the original model from being applied to
         the presolved model.
         """
+        if self.callback_profiler is not None:
+            self.callback_profiler.cuts[self.callback_profiler.where] += 1
         return self.model.cbCut(lhs, rhs, sense)
 
     def cbGet(self, what):
@@ -671,6 +1809,8 @@ class ModelWrapper:
 
         Note that you must set the LazyConstraints parameter to 1 if you want to use lazy constraints.
         """
+        if self.callback_profiler is not None:
+            self.callback_profiler.lazy_constraints[self.callback_profiler.where] += 1
         return self.model.cbLazy(lhs, rhs, sense)
 
     def cbSetSolution(self, vars, values):
@@ -686,6 +1826,8 @@ class ModelWrapper:
         cbUseSolution within your callback function to try to immediately compute a feasible solution from the
         specified values.
         """
+        if self.callback_profiler is not None:
+            self.callback_profiler.solution_pending = True
         return self.model.cbSetSolution(vars, values)
 
     def cbStopOneMultiObj(self, objnum):
@@ -702,8 +1844,12 @@ class ModelWrapper:
         immediately use these values to try to compute a heuristic solution.  Returns the objective value for the
         solution obtained from your solution values (or GRB.INFINITY if no improved solution is found).
         """
+        if self.callback_profiler is not None and self.callback_profiler.solution_pending:
+            self.callback_profiler.solutions[self.callback_profiler.where] += 1
+            self.callback_profiler.solution_pending = False
         return self.model.cbUseSolution()
 
+    @_modifies_model
     def chgCoeff(self, constr, var, newvalue):
         """
         Change one coefficient in the model. The desired change is captured using a Var object, a Constr object, and a
@@ -715,6 +1861,7 @@ class ModelWrapper:
         """
         return self.model.chgCoeff(constr, var, newvalue)
 
+    @_modifies_model
     def computeIIS(self):
         """
         Compute an Irreducible Inconsistent Subsystem (IIS). An IIS is a subset of the constraints and variable bounds
@@ -772,6 +1919,7 @@ class ModelWrapper:
         """
         return self.model.feasibility()
 
+    @_modifies_model
     def feasRelax(self, relaxobjtype, minrelax, vars, lbpen, ubpen, constrs, rhspen):
         """
         Modifies the Model object to create a feasibility relaxation. Note that you need to call optimize on the result
@@ -809,6 +1957,7 @@ class ModelWrapper:
         """
         return self.model.feasRelax(relaxobjtype, minrelax, vars, lbpen, ubpen, constrs, rhspen)
 
+    @_modifies_model
     def feasRelaxS(self, relaxobjtype, minrelax, vrelax, crelax):
         """
         Modifies the Model object to create a feasibility relaxation. Note that you need to call optimize on the
@@ -972,11 +2121,49 @@ class ModelWrapper:
     def message(self, msg):
         return self.model.message(msg)
 
-    def optimize(self, callback=None):
-        if callback is None:
-            return self.model.optimize()
+    def optimize(self, callback=None, profile=False, recorder: SolveTraceRecorder = None,
+                 heuristic: HeuristicRunner = None):
+        """
+        Optimize the model, calling ``callback(self, where)`` if given.  If ``profile`` is True, time spent in the
+        callback and the cuts, lazy constraints and heuristic solutions it adds are recorded per `where`, see
+        :py:meth:`get_callback_profile`.  If a ``recorder`` is given, solve progress is sampled into it.  If a
+        ``heuristic`` runner is given, it is run in the background for the duration of the solve.
+        """
+        if profile:
+            self.callback_profiler = CallbackProfiler()
         else:
-            return self.model.optimize(_wrap_callback(callback))
+            self.callback_profiler = None
+
+        if callback is not None:
+            callback = _wrap_callback(callback, self.callback_profiler)
+        if heuristic is not None:
+            callback = heuristic.wrap(callback)
+        if recorder is not None:
+            recorder.reset()
+            callback = recorder.wrap(callback)
+
+        self._attr_snapshot = None
+        self._optimizing = True
+        if heuristic is not None:
+            heuristic.start(self)
+        try:
+            if callback is None:
+                result = self.model.optimize()
+            else:
+                result = self.model.optimize(callback)
+        finally:
+            self._optimizing = False
+            if heuristic is not None:
+                heuristic.stop()
+        if recorder is not None:
+            recorder.finish(self)
+        return result
+
+    def get_callback_profile(self) -> CallbackProfile:
+        """Callback profile of the last call to ``optimize(..., profile=True)``, or ``None``."""
+        if self.callback_profiler is None:
+            return None
+        return self.callback_profiler.get_profile()
 
     def presolve(self):
         return self.model.presolve()
@@ -990,42 +2177,57 @@ class ModelWrapper:
     def printStats(self):
         return self.model.printStats()
 
+    @_modifies_model
     def read(self, filename):
         return self.model.read(filename)
 
     def relax(self):
         return self.model.relax()
 
+    @_modifies_model
     def remove(self, items):
         return self.model.remove(items)
 
+    @_modifies_model
     def reset(self):
         return self.model.reset()
 
+    @_modifies_model
     def resetParams(self):
         return self.model.resetParams()
 
-    def setAttr(self, attrname, newvalue):
-        return self.model.setAttr(attrname, newvalue)
+    @_modifies_model
+    def setAttr(self, attrname, *args):
+        """
+        Set the value of a model attribute (``setAttr(attrname, newvalue)``), or of an attribute for a list or
+        dictionary of variables or constraints (``setAttr(attrname, objs, newvalues)``).
+        """
+        return self.model.setAttr(attrname, *args)
 
+    @_modifies_model
     def setObjective(self, expression, sense=None):
         return self.model.setObjective(expression, sense=sense)
 
+    @_modifies_model
     def setObjectiveN(self, expression, index):
         return self.model.setObjectiveN(expression, index)
 
+    @_modifies_model
     def setParam(self, paramname, newvalue):
         return self.model.setParam(paramname, newvalue)
 
+    @_modifies_model
     def setPWLObj(self, var, x, y):
         return self.model.setPWLObj(var, x, y)
 
     def terminate(self):
         return self.model.terminate()
 
+    @_modifies_model
     def tune(self):
         return self.model.tune()
 
+    @_modifies_model
     def update(self):
         self.model.update()
 
@@ -1033,49 +2235,97 @@ class ModelWrapper:
         self.model.write(filename)
 
 
+MODEL_ATTR_PROPERTIES = tuple(name for name, val in vars(ModelWrapper).items() if isinstance(val, property))
+ON_DEMAND_MODEL_ATTRS = frozenset({'Kappa', 'KappaExact', 'FarkasProof'})
+SNAPSHOT_MODEL_ATTRS = tuple(name for name in MODEL_ATTR_PROPERTIES if name not in ON_DEMAND_MODEL_ATTRS)
+
+
+@dataclasses.dataclass(frozen=True)
+class VarMetadata:
+    """Classification of the variable family annotations of a :py:class:`BaseGurobiModel` subclass."""
+    lonevars: Tuple[str, ...]
+    intvars: Tuple[str, ...]
+    binvars: Tuple[str, ...]
+    ctsvars: Tuple[str, ...]
+    vars: Tuple[str, ...]
+    types: Dict[str, type]
+
+
 class BaseGurobiModel(ModelWrapper):
-    def __init__(self, name=""):
-        super().__init__(name=name)
-        self.__lonevars__ = []
-        self.__intvars__ = []
-        self.__binvars__ = []
-        self.__ctsvars__ = []
-        for attrname, attrtype in self.__annotations__.items():  # Black 3.7 magic
+    compact_var_values = False
+    _separator_stats: SeparatorStats = None
+
+    @classmethod
+    def get_var_metadata(cls) -> VarMetadata:
+        """
+        Classify the variable family annotations of this class, including those inherited from base classes.  This is
+        done once per class and cached.
+        """
+        meta = cls.__dict__.get('_var_metadata')
+        if meta is not None:
+            return meta
+
+        annotations = dict()
+        for klass in reversed(cls.__mro__):
+            annotations.update(vars(klass).get('__annotations__', {}))
+        lonevars, intvars, binvars, ctsvars = [], [], [], []
+        types = dict()
+        for attrname, attrtype in annotations.items():
             if attrtype == BinVarDict:
-                self.__binvars__.append(attrname)
+                binvars.append(attrname)
             elif attrtype == BinVar:
-                self.__binvars__.append(attrname)
-                self.__lonevars__.append(attrname)
+                binvars.append(attrname)
+                lonevars.append(attrname)
             elif attrtype == IntVarDict:
-                self.__intvars__.append(attrname)
+                intvars.append(attrname)
             elif attrtype == IntVar:
-                self.__intvars__.append(attrname)
-                self.__lonevars__.append(attrname)
+                intvars.append(attrname)
+                lonevars.append(attrname)
             elif attrtype == CtsVarDict:
-                self.__ctsvars__.append(attrname)
+                ctsvars.append(attrname)
             elif attrtype == CtsVar:
-                self.__ctsvars__.append(attrname)
-                self.__lonevars__.append(attrname)
+                ctsvars.append(attrname)
+                lonevars.append(attrname)
             elif attrtype in (VarDict, Var):
                 raise TypeError("VarDict/Var should not be used to denote variables, use BinVarDict, IntVarDict or "
                                 "CtsVarDict, or their *Var equivalents instead.")
             else:
                 continue
-            if attrname in self.__lonevars__:
+            types[attrname] = attrtype
+
+        meta = VarMetadata(lonevars=tuple(lonevars), intvars=tuple(intvars), binvars=tuple(binvars),
+                           ctsvars=tuple(ctsvars), vars=tuple(ctsvars + binvars + intvars), types=types)
+        cls._var_metadata = meta
+        return meta
+
+    def __init__(self, name="", env: Env = None):
+        super().__init__(name=name, env=env)
+        meta = self.get_var_metadata()
+        self.__lonevars__ = meta.lonevars
+        self.__intvars__ = meta.intvars
+        self.__binvars__ = meta.binvars
+        self.__ctsvars__ = meta.ctsvars
+        self.__vars__ = meta.vars
+        for attrname, attrtype in meta.types.items():
+            if attrname in meta.lonevars:
                 setattr(self, attrname, None)
                 setattr(self, attrname + 'v', None)
             else:
                 setattr(self, attrname, attrtype())
                 setattr(self, attrname + 'v', dict())
 
-        self.__intvars__ = tuple(self.__intvars__)
-        self.__binvars__ = tuple(self.__binvars__)
-        self.__ctsvars__ = tuple(self.__ctsvars__)
-        self.__vars__ = self.__ctsvars__ + self.__binvars__ + self.__intvars__
-        self.cut_cache = dict()
-        self.cut_cache_size = 0
+        self._var_layout = None
+        self._relaxed = None
+        self.reset_incumbent_history()
+        self.cut_cache = CutPool()
+        self.column_pool = ColumnPool()
+        self.cut_flush_stats: Dict[str, CutFlushStats] = dict()
         self.cons: Dict[str, Dict[Any, Constr]] = dict()
 
+    @property
+    def cut_cache_size(self):
+        return self.cut_cache.size
+
     @property
     def cons_size(self):
         return {key: 1 if isinstance(val, Constr) else len(val) for key, val in self.cons.items()}
@@ -1093,114 +2343,1087 @@ class BaseGurobiModel(ModelWrapper):
         for varname, vardict in kwargs.items():
             setattr(self, varname, vardict)
 
-    def set_variables_continuous(self):
+    def _get_discrete_vars(self):
+        """All variables of integer and binary families, and the variable types given by their annotations."""
+        layout = self.get_var_layout()
+        vars = []
+        vtypes = []
         for var_attr in self.__intvars__ + self.__binvars__:
-            if var_attr in self.__lonevars__:
-                getattr(self, var_attr).vtype = GRB.CONTINUOUS
-            else:
-                for var in getattr(self, var_attr).values():
-                    var.vtype = GRB.CONTINUOUS
+            family = layout.vars[layout.slices[var_attr]]
+            vars.extend(family)
+            vtypes.extend([GRB.BINARY if var_attr in self.__binvars__ else GRB.INTEGER] * len(family))
+        return vars, vtypes
+
+    def set_variables_continuous(self):
+        vars, _ = self._get_discrete_vars()
+        self.setAttr("VType", vars, [GRB.CONTINUOUS] * len(vars))
 
     def set_variables_integer(self):
-        for var_attr in self.__intvars__ + self.__binvars__:
-            vtype = GRB.BINARY if var_attr in self.__binvars__ else GRB.INTEGER
-            if var_attr in self.__lonevars__:
-                getattr(self, var_attr).vtype = vtype
-            else:
-                for var in getattr(self, var_attr).values():
-                    var.vtype = vtype
+        vars, vtypes = self._get_discrete_vars()
+        self.setAttr("VType", vars, vtypes)
+
+    @contextmanager
+    def relaxed(self, in_place=False, refresh=False, eps=EPS):
+        """
+        Context manager for solving the LP relaxation.  By default, yields a relaxed copy of the model (from
+        ``Model.relax``), which is cached and reused until the model is next changed through the wrapper or
+        ``refresh`` is True; the original model is left untouched.  With ``in_place=True``, the integer and binary
+        families of the model itself are switched to continuous in bulk, and the yielded model is ``self.model``; the
+        original variable types are restored in bulk on exit.
+
+        In both cases, if the yielded model has been solved to optimality when the context exits, its solution is
+        mapped into the ``<name>v`` dictionaries.
+        """
+        layout = self.get_var_layout()
+        if in_place:
+            vars, _ = self._get_discrete_vars()
+            vtypes = self.model.getAttr("VType", vars)
+            self.setAttr("VType", vars, [GRB.CONTINUOUS] * len(vars))
+            lp = self.model
+            lp_vars = layout.vars
+        else:
+            if refresh or self._relaxed is None or self._relaxed[0] != self._model_changes:
+                self.update()
+                lp = self.model.relax()
+                indices = np.fromiter((v.index for v in layout.vars), dtype=np.int64, count=len(layout))
+                lp_vars = lp.getVars()
+                self._relaxed = (self._model_changes, lp, [lp_vars[i] for i in indices])
+            _, lp, lp_vars = self._relaxed
+
+        try:
+            yield lp
+            if lp.getAttr("Status") == GRB.OPTIMAL:
+                x = np.fromiter(lp.getAttr("X", lp_vars), dtype=float, count=len(lp_vars))
+                self._store_var_values(layout, x, eps)
+        finally:
+            if in_place:
+                self.setAttr("VType", vars, vtypes)
+
+    def get_cons_group_items(self, name) -> List[Tuple[Any, Constr]]:
+        """
+        The ``(key, constraint)`` pairs of constraint group ``name`` in ``self.cons``.  The key is ``None`` for a single
+        constraint and the list position for groups stored as lists.
+        """
+        group = self.cons[name]
+        if isinstance(group, Constr):
+            return [(None, group)]
+        elif isinstance(group, dict):
+            return list(group.items())
+        else:
+            return list(enumerate(group))
 
     def get_iis_constraints(self):
+        """
+        After ``computeIIS``, returns the keys of the constraints in each group of ``self.cons`` which are members of
+        the IIS (``None`` for single constraints), fetched with one attribute query per group.  Groups with no IIS
+        members are omitted.
+        """
         iis_keys = dict()
-        for name, constrdict in self.cons.items():
-            if isinstance(constrdict, Constr):
-                if constrdict.IISConstr > 0:
+        for name, group in self.cons.items():
+            items = self.get_cons_group_items(name)
+            flags = self.model.getAttr("IISConstr", [c for _, c in items])
+            if isinstance(group, Constr):
+                if flags[0] > 0:
                     iis_keys[name] = None
             else:
-                keys = [k for k, cons in constrdict.items() if cons.IISConstr > 0]
+                keys = list(compress((k for k, _ in items), flags))
                 if len(keys) > 0:
                     iis_keys[name] = keys
 
         return iis_keys
 
-    def update_var_values(self, where=None, eps=EPS):
+    def get_iis_bounds(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        After ``computeIIS``, returns two dictionaries, for lower and upper variable bounds respectively, mapping each
+        annotated variable family to the keys of the variables whose bound is a member of the IIS (``None`` for lone
+        variables).  Families with no IIS members are omitted.
+        """
+        layout = self.get_var_layout()
+        iis_bounds = []
+        for attr in ("IISLB", "IISUB"):
+            flags = np.fromiter(self.model.getAttr(attr, layout.vars), dtype=bool, count=len(layout))
+            members = dict()
+            for var_attr in self.__vars__:
+                family_flags = flags[layout.slices[var_attr]]
+                if not family_flags.any():
+                    continue
+                keys = layout.keys[var_attr]
+                members[var_attr] = None if keys is None else list(compress(keys, family_flags))
+            iis_bounds.append(members)
+        return tuple(iis_bounds)
+
+    def _is_feasible(self):
+        self.optimize()
+        status = self.model.getAttr("Status")
+        if status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+            return False
+        elif status in (GRB.OPTIMAL, GRB.UNBOUNDED, GRB.SUBOPTIMAL) or self.model.getAttr("SolCount") > 0:
+            return True
+        return None
+
+    def compute_group_iis(self, groups=None, method='deletion', time_limit=None) -> List[str]:
+        """
+        Cheap, coarse IIS diagnosis over whole constraint groups of ``self.cons`` (default all) instead of individual
+        constraints.  Constraints outside ``groups`` and variable bounds are always enforced.  Only linear constraints
+        are supported.
+
+        With ``method='deletion'``, each group in turn is switched off (by making its constraints redundant) and left
+        off if the model remains infeasible.  The result is a minimal list of groups which together are infeasible;
+        feasibility checks which hit ``time_limit`` seconds are treated as feasible, so the result is always infeasible
+        but may not be minimal.
+
+        With ``method='feasrelax'``, a copy of the model is solved as a feasibility relaxation over the constraints of
+        ``groups`` and the groups with violated constraints in the relaxed solution are returned.
+
+        :raises ValueError: if the model is feasible.
+        """
+        if groups is None:
+            groups = list(self.cons.keys())
+        params = {"DualReductions": 0}
+        if time_limit is not None:
+            params["TimeLimit"] = time_limit
+        if method == 'deletion':
+            return self._group_iis_deletion(groups, dict(params, SolutionLimit=1))
+        elif method == 'feasrelax':
+            return self._group_iis_feasrelax(groups, params)
+        else:
+            raise ValueError(f"Unknown group IIS method `{method}`, must be one of deletion, feasrelax")
+
+    def _group_iis_deletion(self, groups, params):
+        disabled = dict()
+        try:
+            with self.temp_params(**params):
+                if self._is_feasible() is not False:
+                    raise ValueError("model is not infeasible")
+                iis_groups = []
+                for name in groups:
+                    constrs = [c for _, c in self.get_cons_group_items(name)]
+                    disabled[name] = (constrs, self.model.getAttr("Sense", constrs), self.model.getAttr("RHS", constrs))
+                    self.setAttr("Sense", constrs, [GRB.LESS_EQUAL] * len(constrs))
+                    self.setAttr("RHS", constrs, [GRB.INFINITY] * len(constrs))
+                    if self._is_feasible() is not False:
+                        constrs, senses, rhs = disabled.pop(name)
+                        self.setAttr("Sense", constrs, senses)
+                        self.setAttr("RHS", constrs, rhs)
+                        iis_groups.append(name)
+        finally:
+            for constrs, senses, rhs in disabled.values():
+                self.setAttr("Sense", constrs, senses)
+                self.setAttr("RHS", constrs, rhs)
+            self.model.reset()
+        return iis_groups
+
+    def _group_iis_feasrelax(self, groups, params):
+        self.model.update()
+        group_of = dict()
+        for name in groups:
+            for _, c in self.get_cons_group_items(name):
+                group_of[c.index] = name
+        relaxed = self.model.copy()
+        for param, val in params.items():
+            relaxed.setParam(param, val)
+        relaxed_constrs = relaxed.getConstrs()
+        constrs = [relaxed_constrs[i] for i in group_of]
+        num_vars = relaxed.getAttr("NumVars")
+        relaxed.feasRelax(0, False, None, None, None, constrs, [1.0] * len(constrs))
+        relaxed.optimize()
+        if relaxed.getAttr("SolCount") == 0:
+            raise ValueError("feasibility relaxation could not be solved")
+        if relaxed.getAttr("ObjVal") <= EPS:
+            raise ValueError("model is not infeasible")
+        artificial = relaxed.getVars()[num_vars:]
+        violated = set()
+        for var, val in zip(artificial, relaxed.getAttr("X", artificial)):
+            if val > EPS:
+                col = relaxed.getCol(var)
+                violated.update(group_of[col.getConstr(i).index] for i in range(col.size()))
+        return [name for name in groups if name in violated]
+
+    def freeze_var_layout(self) -> VarLayout:
+        """
+        Build the flat variable layout used for bulk solution queries and keep it for later queries.  Should be called
+        once the model has been built; the layout is rebuilt automatically if a variable family is replaced or
+        resized, but not if individual variables are swapped in place.
+        """
+        self._var_layout = VarLayout(self)
+        return self._var_layout
+
+    def get_var_layout(self) -> VarLayout:
+        """Flat layout of all annotated variable families, see :py:class:`VarLayout`."""
+        if self._var_layout is None or not self._var_layout.is_current(self):
+            return self.freeze_var_layout()
+        return self._var_layout
+
+    def _query_var_values(self, vars, where=None) -> np.ndarray:
+        if where is None:
+            values = self.model.getAttr("X", vars)
+        elif where == GRB.Callback.MIPSOL:
+            values = self.cbGetSolution(vars)
+        elif where == GRB.Callback.MIPNODE:
+            values = self.cbGetNodeRel(vars)
+        else:
+            raise ValueError("`where` is must be one of: None, GRB.Callback.MIPSOL, GRB.Callback.MIPNODE")
+        return np.fromiter(values, dtype=float, count=len(vars))
+
+    def get_var_value_arrays(self, where=None, eps=None) -> Dict[str, Tuple[Any, np.ndarray]]:
+        """
+        Bulk query the solution values of all annotated variable families with a single attribute query (``where=None``)
+        or a single ``cbGetSolution``/``cbGetNodeRel`` call (``where=GRB.Callback.MIPSOL``/``GRB.Callback.MIPNODE``).
+        Returns a dictionary mapping each family name to a ``(keys, values)`` pair, where ``values`` is a NumPy array
+        aligned with the list ``keys`` (``None`` for lone variables).  Unfiltered ``values`` are views into one flat
+        array.  If ``eps`` is given, entries of variable dictionaries with a value not greater than ``eps`` are dropped.
+        """
+        layout = self.get_var_layout()
+        return self._split_var_values(layout, self._query_var_values(layout.vars, where), eps)
+
+    def _split_var_values(self, layout: VarLayout, values: np.ndarray, eps=None):
+        arrays = dict()
         for var_attr in self.__vars__:
-            val_attr = var_attr + 'v'
-            if where is None:
-                if var_attr in self.__lonevars__:
-                    setattr(self, val_attr, getattr(self, var_attr).X)
-                else:
-                    setattr(self, val_attr,
-                            {k: var.X for k, var in getattr(self, var_attr).items() if var.X > eps})
+            keys = layout.keys[var_attr]
+            vals = values[layout.slices[var_attr]]
+            if eps is not None and keys is not None:
+                mask = vals > eps
+                keys = list(compress(keys, mask))
+                vals = vals[mask]
+            arrays[var_attr] = (keys, vals)
+        return arrays
+
+    def _set_var_values(self, arrays: Dict[str, Tuple[Any, np.ndarray]]):
+        for var_attr, (keys, vals) in arrays.items():
+            if keys is None:
+                setattr(self, var_attr + 'v', float(vals[0]))
+            else:
+                setattr(self, var_attr + 'v', dict(zip(keys, vals.tolist())))
 
-            elif where == GRB.Callback.MIPSOL:
-                if var_attr in self.__lonevars__:
-                    setattr(self, val_attr, self.cbGetSolution(getattr(self, var_attr)))
-                else:
-                    vardict = getattr(self, var_attr)
+    def update_var_values(self, where=None, eps=EPS, compact=None):
+        """
+        Store the current solution values of each family ``name`` in ``<name>v``, dropping entries of variable
+        dictionaries not greater than ``eps``.  If ``compact`` is true (default: ``self.compact_var_values``),
+        variable dictionaries are stored as :py:class:`CompactVarValues` rather than as ``dict``.
+        """
+        layout = self.get_var_layout()
+        self._store_var_values(layout, self._query_var_values(layout.vars, where), eps, compact)
+
+    def _store_var_values(self, layout: VarLayout, values: np.ndarray, eps, compact=None):
+        if compact is None:
+            compact = self.compact_var_values
+        if not compact:
+            self._set_var_values(self._split_var_values(layout, values, eps))
+            return
+        for var_attr in self.__vars__:
+            vals = values[layout.slices[var_attr]]
+            if var_attr in self.__lonevars__:
+                setattr(self, var_attr + 'v', float(vals[0]))
+            else:
+                setattr(self, var_attr + 'v', CompactVarValues(layout.get_key_index(var_attr), vals, eps))
 
-                    setattr(self, val_attr,
-                            dict((k, v) for k, v in zip(vardict.keys(), self.cbGetSolution(list(vardict.values()))) if
-                                 v > eps))
-            elif where == GRB.Callback.MIPNODE:
-                if var_attr in self.__lonevars__:
-                    setattr(self, val_attr, self.cbGetNodeRel(getattr(self, var_attr)))
-                else:
-                    vardict = getattr(self, var_attr)
-                    setattr(self, val_attr,
-                            dict((k, v) for k, v in zip(vardict.keys(), self.cbGetNodeRel(list(vardict.values()))) if
-                                 v > eps))
+    def optimize(self, callback=None, profile=False, recorder: SolveTraceRecorder = None,
+                 heuristic: HeuristicRunner = None):
+        self.reset_incumbent_history()
+        return super().optimize(callback, profile, recorder, heuristic)
+
+    def reset_incumbent_history(self):
+        """Forget the incumbents seen by :py:meth:`update_incumbent`; done automatically at the start of a solve."""
+        self._incumbent_hashes = set()
+        self._last_incumbent = None
+        self.changed_var_keys = dict()
+
+    def update_incumbent(self, where=GRB.Callback.MIPSOL, eps=EPS, tol=EPS) -> bool:
+        """
+        Like :py:meth:`update_var_values`, but also hashes the solution (rounded to multiples of ``tol``) and returns
+        False if the same solution was already seen in this solve, so optional separation (user cuts) can be skipped.
+        Lazy constraint separation must not be skipped: the solver may present a solution again which violates lazy
+        constraints added earlier, and the callback has to cut it off again with ``cbLazy``.  The keys of the variables
+        whose values changed by more than ``tol`` since the previous call are stored per family in
+        ``self.changed_var_keys`` (``[None]`` or ``[]`` for lone variables), so separators can work incrementally.
+        """
+        layout = self.get_var_layout()
+        values = self._query_var_values(layout.vars, where)
+        digest = hashlib.blake2b(np.rint(values / tol).astype(np.int64).tobytes(), digest_size=16).digest()
+        is_new = digest not in self._incumbent_hashes
+        self._incumbent_hashes.add(digest)
+
+        last = self._last_incumbent
+        if last is None or len(last) != len(values):
+            changed = np.arange(len(values))
+        else:
+            changed = np.flatnonzero(np.abs(values - last) > tol)
+        self._last_incumbent = values
+        changed_keys = dict()
+        for var_attr in self.__vars__:
+            sl = layout.slices[var_attr]
+            lo, hi = np.searchsorted(changed, [sl.start, sl.stop])
+            keys = layout.keys[var_attr]
+            if keys is None:
+                changed_keys[var_attr] = [None] if hi > lo else []
             else:
-                raise ValueError("`where` is must be one of: None, GRB.Callback.MIPSOL, GRB.Callback.MIPNODE")
+                changed_keys[var_attr] = [keys[i] for i in (changed[lo:hi] - sl.start).tolist()]
+        self.changed_var_keys = changed_keys
+        self._store_var_values(layout, values, eps)
+        return is_new
+
+    def _select_cons(self, name, values):
+        """Constraints of group ``name`` and new values, given as a mapping from keys or an array over the group."""
+        if isinstance(values, Mapping):
+            group = self.cons[name]
+            if isinstance(group, Constr):
+                raise TypeError(f"constraint group `{name}` is a single constraint, values must be a scalar")
+            return [group[k] for k in values.keys()], list(values.values())
+        constrs = [c for _, c in self.get_cons_group_items(name)]
+        values = np.broadcast_to(np.asarray(values, dtype=float), (len(constrs),))
+        return constrs, values.tolist()
+
+    def _select_vars(self, var_attr, values, layout: VarLayout):
+        """Variables of family ``var_attr`` and new values, given as a mapping from keys or an array over the family."""
+        if isinstance(values, Mapping):
+            family = getattr(self, var_attr)
+            if var_attr in self.__lonevars__:
+                raise TypeError(f"`{var_attr}` is a lone variable, values must be a scalar")
+            return [family[k] for k in values.keys()], list(values.values())
+        vars = layout.vars[layout.slices[var_attr]]
+        values = np.broadcast_to(np.asarray(values, dtype=float), (len(vars),))
+        return vars, values.tolist()
+
+    def update_data(self, rhs: Dict[str, Any] = None, obj: Dict[str, Any] = None, lb: Dict[str, Any] = None,
+                    ub: Dict[str, Any] = None):
+        """
+        Change right-hand sides, objective coefficients and variable bounds in bulk, with one attribute call per
+        constraint group or variable family.  ``rhs`` maps names of ``self.cons`` groups, and ``obj``, ``lb`` and
+        ``ub`` map names of annotated variable families, to new values: either a mapping from (a subset of) the keys
+        to values, or an array (or scalar) covering the whole group or family in key order.
+        """
+        if rhs is not None:
+            for name, values in rhs.items():
+                self.setAttr("RHS", *self._select_cons(name, values))
+        layout = self.get_var_layout()
+        for attr, changes in (("Obj", obj), ("LB", lb), ("UB", ub)):
+            if changes is not None:
+                for var_attr, values in changes.items():
+                    self.setAttr(attr, *self._select_vars(var_attr, values, layout))
+
+    def resolve(self, rhs: Dict[str, Any] = None, obj: Dict[str, Any] = None, lb: Dict[str, Any] = None,
+                ub: Dict[str, Any] = None, callback=None, update_values=True, eps=EPS):
+        """
+        Apply bulk data changes (see :py:meth:`update_data`) and re-optimize, warm-starting from the previous solve:
+        LPs restart from the previous basis, and for MIPs the previous solution is supplied as the ``Start``.  If
+        ``update_values`` is True, the ``<name>v`` dictionaries are updated with the new solution, if any.
+        """
+        layout = self.get_var_layout()
+        start = None
+        if self.IsMIP and self.SolCount:
+            start = self.model.getAttr("X", layout.vars)
+        self.update_data(rhs=rhs, obj=obj, lb=lb, ub=ub)
+        if start is not None:
+            self.setAttr("Start", layout.vars, start)
+        result = self.optimize(callback)
+        if update_values and self.SolCount:
+            self.update_var_values(eps=eps)
+        return result
+
+    def get_constr(self, group: str, key=None) -> Constr:
+        """The constraint with ``key`` in group ``group`` of ``self.cons`` (``key=None`` for single constraints)."""
+        group = self.cons[group]
+        if key is None and isinstance(group, Constr):
+            return group
+        return group[key]
+
+    def add_columns(self, family: str, columns: Mapping[Any, Mapping[Tuple[str, Any], float]], obj=0.0, lb=0.0,
+                    ub=GRB.INFINITY):
+        """
+        Add a batch of columns to variable family ``family``.  ``columns`` maps each new variable key to its sparse
+        column, a mapping from constraint references ``(group, key)`` into ``self.cons`` to coefficients.  ``obj``,
+        ``lb`` and ``ub`` are scalars or mappings from the new keys.  The variable type follows the family annotation.
+        Returns a dictionary of the new variables.
+
+        This is not a bulk add: gurobipy has no call that adds several variables with columns at once, so each
+        column is still one ``addVar`` call.  What is batched is the constraint lookup (once per distinct constraint)
+        and the model update (once for the whole batch).
+        """
+        vardict = getattr(self, family)
+        if family in self.__lonevars__:
+            raise TypeError(f"`{family}` is a lone variable, not a variable family")
+        if family in self.__binvars__:
+            vtype = GRB.BINARY
+        elif family in self.__intvars__:
+            vtype = GRB.INTEGER
+        else:
+            vtype = GRB.CONTINUOUS
+
+        constrs = dict()
+        new_vars = dict()
+        for key, column in columns.items():
+            col_constrs = []
+            for ref in column.keys():
+                c = constrs.get(ref)
+                if c is None:
+                    c = constrs[ref] = self.get_constr(*ref)
+                col_constrs.append(c)
+            new_vars[key] = self.model.addVar(
+                lb=lb[key] if isinstance(lb, Mapping) else lb,
+                ub=ub[key] if isinstance(ub, Mapping) else ub,
+                obj=obj[key] if isinstance(obj, Mapping) else obj,
+                vtype=vtype,
+                column=Column(list(column.values()), col_constrs))
+        self.update()
+        vardict.update(new_vars)
+        # the family changed in place, which VarLayout.is_current cannot detect if its size is unchanged
+        self._var_layout = None
+        return new_vars
+
+    def _get_cons_refs(self) -> Dict[int, Tuple[str, Any]]:
+        refs = dict()
+        for name, group in self.cons.items():
+            single = isinstance(group, Constr)
+            for key, c in self.get_cons_group_items(name):
+                refs[c.index] = (name, None if single else key)
+        return refs
+
+    def deactivate_columns(self, family: str, keys=None, rc_threshold=EPS, eps=EPS) -> List:
+        """
+        Move columns of ``family`` out of the model into ``self.column_pool``.  If ``keys`` is None, after an LP
+        solve, all columns at zero whose reduced cost is worse than ``rc_threshold`` (in the direction of the model
+        sense) are moved.  Coefficients in constraints outside ``self.cons`` are lost.  Returns the moved keys.
+        """
+        vardict = getattr(self, family)
+        if keys is None:
+            all_keys = list(vardict.keys())
+            vars = list(vardict.values())
+            x = np.fromiter(self.model.getAttr("X", vars), dtype=float, count=len(vars))
+            rc = np.fromiter(self.model.getAttr("RC", vars), dtype=float, count=len(vars))
+            keys = list(compress(all_keys, (np.abs(x) <= eps) & (rc * self.ModelSense > rc_threshold)))
+        if len(keys) == 0:
+            return keys
+
+        refs = self._get_cons_refs()
+        vars = [vardict[k] for k in keys]
+        obj = self.model.getAttr("Obj", vars)
+        lb = self.model.getAttr("LB", vars)
+        ub = self.model.getAttr("UB", vars)
+        for k, var, o, l, u in zip(keys, vars, obj, lb, ub):
+            col = self.model.getCol(var)
+            column = dict()
+            for i in range(col.size()):
+                ref = refs.get(col.getConstr(i).index)
+                if ref is not None:
+                    column[ref] = col.getCoeff(i)
+            self.column_pool.add(family, k, column, o, l, u)
+            del vardict[k]
+        self._var_layout = None
+        self.remove(vars)
+        self.update()
+        return keys
+
+    def reprice_column_pool(self, family: str, tol=EPS) -> Dict[Any, Var]:
+        """
+        After an LP solve, compute the reduced costs of the pooled columns of ``family`` from the constraint duals
+        (one bulk ``Pi`` query) and add back, in bulk, those with an improving reduced cost.  Returns the re-added
+        variables.
+        """
+        items = list(self.column_pool.items(family))
+        if len(items) == 0:
+            return dict()
+        ref_index = dict()
+        for _, (refs, _, _, _, _) in items:
+            for ref in refs:
+                if ref not in ref_index:
+                    ref_index[ref] = len(ref_index)
+        pi = np.fromiter(self.model.getAttr("Pi", [self.get_constr(*ref) for ref in ref_index]), dtype=float,
+                         count=len(ref_index))
+        n = len(items)
+        lengths = np.fromiter((len(refs) for _, (refs, _, _, _, _) in items), dtype=np.int64, count=n)
+        positions = np.fromiter((ref_index[ref] for _, (refs, _, _, _, _) in items for ref in refs), dtype=np.int64,
+                                count=lengths.sum())
+        coeffs = np.concatenate([c for _, (_, c, _, _, _) in items])
+        obj = np.fromiter((o for _, (_, _, o, _, _) in items), dtype=float, count=n)
+        rc = obj - np.bincount(np.repeat(np.arange(n), lengths), weights=pi[positions] * coeffs, minlength=n)
+        improving = list(compress((k for k, _ in items), rc * self.ModelSense < -tol))
+        if len(improving) == 0:
+            return dict()
+        columns = self.column_pool.pop(family, improving)
+        return self.add_columns(family,
+                                {k: dict(zip(refs, coeffs.tolist())) for k, (refs, coeffs, _, _, _) in columns.items()},
+                                obj={k: c[2] for k, c in columns.items()},
+                                lb={k: c[3] for k, c in columns.items()},
+                                ub={k: c[4] for k, c in columns.items()})
+
+    def get_basis(self, duals=True) -> BasisSnapshot:
+        """
+        After solving an LP with simplex, capture ``VBasis`` of all annotated variable families and ``CBasis`` of all
+        groups in ``self.cons``, and if ``duals`` is True also ``RC`` and ``Pi``, with one attribute query each.  The
+        snapshot can be reapplied with :py:meth:`set_basis`, also to a modified or rebuilt model.
+        """
+        layout = self.get_var_layout()
+        cons_keys = dict()
+        cons_slices = dict()
+        constrs = []
+        for name in self.cons:
+            items = self.get_cons_group_items(name)
+            cons_slices[name] = slice(len(constrs), len(constrs) + len(items))
+            cons_keys[name] = [k for k, _ in items]
+            constrs.extend(c for _, c in items)
+
+        def query(attrname, objs, dtype):
+            return np.fromiter(self.model.getAttr(attrname, objs), dtype=dtype, count=len(objs))
+
+        rc, pi = None, None
+        if duals:
+            try:
+                rc = query("RC", layout.vars, float)
+                pi = query("Pi", constrs, float)
+            except GurobiError:
+                rc, pi = None, None
+        return BasisSnapshot(vbasis=query("VBasis", layout.vars, np.int8), rc=rc, var_keys=dict(layout.keys),
+                             var_slices=dict(layout.slices), cbasis=query("CBasis", constrs, np.int8), pi=pi,
+                             cons_keys=cons_keys, cons_slices=cons_slices)
+
+    def set_basis(self, basis: BasisSnapshot) -> Tuple[int, int]:
+        """
+        Warm start the next LP solve from ``basis``, matching variables and constraints by family/group name and key.
+        Unmatched variables are made nonbasic at a finite bound (superbasic if free) and unmatched constraints basic,
+        which keeps the basis valid when columns or rows have been added.  If the result is not a valid basis, the
+        solver ignores it.  Returns the number of matched variables and constraints.
+        """
+        def match(old_keys, new_keys, old_values, out):
+            if old_keys is None or new_keys is None:
+                if old_keys is None and new_keys is None:
+                    out[:] = old_values
+                    return 1
+                return 0
+            if old_keys == new_keys:
+                out[:] = old_values
+                return len(new_keys)
+            position = {k: i for i, k in enumerate(old_keys)}
+            idx = np.fromiter((position.get(k, -1) for k in new_keys), dtype=np.int64, count=len(new_keys))
+            found = idx >= 0
+            out[found] = old_values[idx[found]]
+            return int(found.sum())
+
+        self.update()
+        allvars = self.model.getVars()
+        layout = self.get_var_layout()
+        vbasis = np.full(len(layout), np.iinfo(np.int8).min, dtype=np.int8)
+        matched_vars = 0
+        for var_attr in self.__vars__:
+            if var_attr in basis.var_keys:
+                matched_vars += match(basis.var_keys[var_attr], layout.keys[var_attr],
+                                      basis.vbasis[basis.var_slices[var_attr]], vbasis[layout.slices[var_attr]])
+        all_vbasis = np.full(len(allvars), np.iinfo(np.int8).min, dtype=np.int8)
+        all_vbasis[np.fromiter((v.index for v in layout.vars), dtype=np.int64, count=len(layout))] = vbasis
+        unmatched = np.flatnonzero(all_vbasis == np.iinfo(np.int8).min)
+        if len(unmatched) > 0:
+            lb = np.fromiter(self.model.getAttr("LB", allvars), dtype=float, count=len(allvars))[unmatched]
+            ub = np.fromiter(self.model.getAttr("UB", allvars), dtype=float, count=len(allvars))[unmatched]
+            all_vbasis[unmatched] = np.where(lb > -GRB.INFINITY, GRB.NONBASIC_LOWER,
+                                             np.where(ub < GRB.INFINITY, GRB.NONBASIC_UPPER, GRB.SUPERBASIC))
+
+        allcons = self.model.getConstrs()
+        all_cbasis = np.full(len(allcons), GRB.BASIC, dtype=np.int8)
+        matched_cons = 0
+        for name in self.cons:
+            if name not in basis.cons_keys:
+                continue
+            items = self.get_cons_group_items(name)
+            cbasis = np.full(len(items), GRB.BASIC, dtype=np.int8)
+            matched_cons += match(basis.cons_keys[name], [k for k, _ in items], basis.cbasis[basis.cons_slices[name]],
+                                  cbasis)
+            all_cbasis[np.fromiter((c.index for _, c in items), dtype=np.int64, count=len(items))] = cbasis
+
+        self.setAttr("VBasis", allvars, all_vbasis.tolist())
+        self.setAttr("CBasis", allcons, all_cbasis.tolist())
+        return matched_vars, matched_cons
+
+    def get_solution_pool(self, sparse=False, eps=EPS) -> SolutionPool:
+        """
+        Extract all solutions in the solution pool with one bulk ``Xn`` query per solution.  If ``sparse`` is True,
+        the values are returned as a CSR matrix holding only entries with an absolute value greater than ``eps``,
+        otherwise as a dense array.
+        """
+        layout = self.get_var_layout()
+        n_sols = self.SolCount or 0
+        n_vars = len(layout)
+        obj_vals = np.empty(n_sols)
+        if sparse:
+            indptr = np.zeros(n_sols + 1, dtype=np.int64)
+            indices, data = [], []
+        else:
+            values = np.empty((n_sols, n_vars))
+
+        with self.temp_params(SolutionNumber=0):
+            for k in range(n_sols):
+                self.model.setParam("SolutionNumber", k)
+                row = np.fromiter(self.model.getAttr("Xn", layout.vars), dtype=float, count=n_vars)
+                obj_vals[k] = self.model.getAttr("PoolObjVal")
+                if sparse:
+                    nz = np.flatnonzero(np.abs(row) > eps)
+                    indices.append(nz)
+                    data.append(row[nz])
+                    indptr[k + 1] = indptr[k] + len(nz)
+                else:
+                    values[k] = row
+
+        if sparse:
+            values = scipy.sparse.csr_matrix(
+                (np.concatenate(data) if data else np.empty(0), np.concatenate(indices) if indices else
+                 np.empty(0, dtype=np.int64), indptr), shape=(n_sols, n_vars))
+        return SolutionPool(values=values, obj_vals=obj_vals, keys=dict(layout.keys), slices=dict(layout.slices))
+
+    def _add_sparse_rows(self, rows):
+        """Add sparse ``(indices, coeffs, sense, rhs)`` rows to the model in bulk, returning the constraints."""
+        if len(rows) == 0:
+            return []
+        if hasattr(self.model, 'addMConstr'):
+            indptr = np.cumsum([0] + [len(r[0]) for r in rows])
+            A = scipy.sparse.csr_matrix((np.concatenate([r[1] for r in rows]), np.concatenate([r[0] for r in rows]),
+                                         indptr), shape=(len(rows), self.model.getAttr("NumVars")))
+            constrs = self.addMConstr(A, None, np.array([r[2] for r in rows]), np.array([r[3] for r in rows]))
+            return constrs.tolist() if hasattr(constrs, 'tolist') else list(constrs)
+        allvars = self.model.getVars()
+        return [self.addLConstr(LinExpr(coeffs.tolist(), [allvars[i] for i in indices]), sense, rhs)
+                for indices, coeffs, sense, rhs in rows]
 
     def flush_cut_cache(self):
+        """
+        Add all cached cuts to the model as constraint groups in ``self.cons``, named after their cache.  Cuts with the
+        same normalised sparse signature are added only once (keeping the tightest right-hand side), and the
+        survivors of each cache are added in bulk, with their coefficients, sense and right-hand side as cached.
+        Per-cache counts of added and dropped cuts are stored in ``self.cut_flush_stats``.  Returns the total number of
+        cuts added.
+        """
         total = 0
-        for constraint_name in self.cut_cache:
-            if isinstance(self.cut_cache[constraint_name], dict):
-                self.cons[constraint_name] = dict()
-                for idx, cut in self.cut_cache[constraint_name].items():
-                    self.cons[constraint_name][idx] = self.addConstr(cut)
-                    total += 1
+        self.cut_flush_stats = dict()
+        for constraint_name, cache in self.cut_cache.items():
+            survivors, dropped = _dedup_cuts((k, cut.row) for k, cut in cache.items())
+            constrs = self._add_sparse_rows([cache[k].original_row for k, _ in survivors])
+            if cache.keyed:
+                self.cons[constraint_name] = dict(zip((k for k, _ in survivors), constrs))
             else:
-                self.cons[constraint_name] = [self.addConstr(cut) for cut in self.cut_cache[constraint_name]]
-                total += 1
+                self.cons[constraint_name] = constrs
+            self.cut_flush_stats[constraint_name] = CutFlushStats(added=len(constrs), dropped=dropped)
+            cache.stats.flushed += len(constrs)
+            total += len(constrs)
         self.cut_cache.clear()
-        self.cut_cache_size = 0
         return total
 
-    def get_gurobi_model_information(self) -> GurobiModelInformation:
-        kwargs = {}
-        for attr in dataclasses.fields(GurobiModelInformation):
+    def row_generation(self, oracles: Mapping[str, Callable[['BaseGurobiModel'], Any]], max_iterations: int = None,
+                       time_limit: float = None, callback=None, eps=EPS, tol=1e-6) -> RowGenerationTrace:
+        """
+        Iterative row generation: solve, separate violated rows, add them in bulk and re-solve until no oracle returns
+        a row, ``max_iterations`` solves have been done or ``time_limit`` seconds (wall clock, enforced through the
+        ``TimeLimit`` parameter) have passed.  After each solve, ``<name>v`` values are updated (with ``eps``) and each
+        ``oracles[group](self)`` returns the violated rows for ``self.cons[group]`` as a mapping from keys to
+        ``TempConstr`` or as a list (appended to the group).  Rows are deduplicated by their normalised signature as in
+        :py:meth:`flush_cut_cache`, also against rows added to the group in earlier iterations, and rows which are not
+        violated by more than ``tol`` at the current solution are dropped.  The surviving rows are added as returned.
+        MIPs are warm started from the previous solution through ``Start``; LPs re-solve from the previous basis.
+        ``callback`` is passed on to :py:meth:`optimize`.
+        """
+        trace = RowGenerationTrace(rows={group: [] for group in oracles})
+        start = time.time()
+        self.update()
+        layout = self.get_var_layout()
+        layout_index = np.fromiter((v.index for v in layout.vars), dtype=np.int64, count=len(layout))
+        allvars = self.model.getVars()
+        added = {group: dict() for group in oracles}
+        x = None
+        while True:
+            if max_iterations is not None and trace.iterations >= max_iterations:
+                trace.stop_reason = 'iteration_limit'
+                break
+            params = dict()
+            if time_limit is not None:
+                remaining = time_limit - (time.time() - start)
+                if remaining <= 0:
+                    trace.stop_reason = 'time_limit'
+                    break
+                params['TimeLimit'] = remaining
+            if x is not None and self.IsMIP:
+                self.setAttr("Start", layout.vars, x.tolist())
+
+            t = time.time()
+            with self.temp_params(**params):
+                self.optimize(callback)
+            trace.solve_time.append(time.time() - t)
+            status = self.Status
+            trace.status.append(status)
+            trace.obj_val.append(self.ObjVal if self.SolCount > 0 else None)
+            if status != GRB.OPTIMAL:
+                for group in oracles:
+                    trace.rows[group].append(0)
+                trace.separation_time.append(0.)
+                trace.add_time.append(0.)
+                trace.stop_reason = 'time_limit' if status == GRB.TIME_LIMIT else 'status'
+                break
+
+            allx = self._query_var_values(allvars)
+            x = allx[layout_index]
+            self._store_var_values(layout, x, eps)
+            t = time.time()
+            violated = {group: oracle(self) for group, oracle in oracles.items()}
+            trace.separation_time.append(time.time() - t)
+
+            t = time.time()
+            total = 0
+            for group, rows in violated.items():
+                keyed = isinstance(rows, Mapping)
+                normalised = {k: _normalise_cut(cut) for k, cut in (rows.items() if keyed else enumerate(rows))}
+                survivors, _ = _dedup_cuts((k, row) for k, (row, _, _) in normalised.items())
+                group_added = added[group]
+                new = []
+                for k, row in survivors:
+                    indices, coeffs, sense, rhs = row
+                    slack = float(coeffs @ allx[indices]) - rhs
+                    if (slack if sense == GRB.LESS_EQUAL else abs(slack)) <= tol:
+                        continue
+                    sig = _cut_signature(*row)
+                    if sig in group_added and rhs >= group_added[sig] - tol:
+                        continue
+                    group_added[sig] = rhs
+                    _, scale, original_sense = normalised[k]
+                    new.append((k, (indices, coeffs * scale, original_sense, rhs * scale)))
+                survivors = new
+                constrs = self._add_sparse_rows([row for _, row in survivors])
+                if keyed:
+                    self.cons.setdefault(group, dict()).update(zip((k for k, _ in survivors), constrs))
+                else:
+                    self.cons.setdefault(group, []).extend(constrs)
+                trace.rows[group].append(len(constrs))
+                total += len(constrs)
+            trace.add_time.append(time.time() - t)
+            if total == 0:
+                trace.stop_reason = 'converged'
+                break
+        return trace
+
+    def get_fingerprint(self) -> str:
+        """
+        A short hash identifying this model instance: its class, model name, the names of its annotated variable
+        families and constraint groups, the model sense and dimensions (variables, constraints and nonzeros), and the
+        objective coefficients, bounds and types of all variables and the senses and right-hand sides of all
+        constraints, each fetched with one attribute query.  Constraint coefficients are not hashed, so pass a more
+        specific fingerprint (eg, built from the instance inputs) to :py:meth:`save_warm_start`/
+        :py:meth:`load_warm_start` if instances may differ only there.
+        """
+        self.update()
+        model = self.model
+        s = json.dumps([type(self).__qualname__, self.ModelName, list(self.__vars__), sorted(self.cons.keys()),
+                        self.ModelSense, self.ObjCon, self.NumVars, self.NumConstrs, self.NumNZs])
+        h = hashlib.blake2b(s.encode(), digest_size=8)
+        allvars = model.getVars()
+        allcons = model.getConstrs()
+        for attrname in ("Obj", "LB", "UB"):
+            h.update(np.fromiter(model.getAttr(attrname, allvars), dtype=float, count=len(allvars)).tobytes())
+        h.update(''.join(model.getAttr("VType", allvars)).encode())
+        h.update(np.fromiter(model.getAttr("RHS", allcons), dtype=float, count=len(allcons)).tobytes())
+        h.update(''.join(model.getAttr("Sense", allcons)).encode())
+        return h.hexdigest()
+
+    def save_warm_start(self, store: WarmStartStore, parameter_string: str, fingerprint: str = None, where=None,
+                        eps=EPS, overwrite=False) -> bool:
+        """
+        Save the current incumbent (``where=None``) or the new MIP solution inside a MIPSOL callback
+        (``where=GRB.Callback.MIPSOL``) to ``store``.  Values not greater than ``eps`` are not stored.  Unless
+        ``overwrite`` is True, an existing entry is only replaced by a better incumbent.  Returns True if saved.
+        """
+        if fingerprint is None:
+            fingerprint = self.get_fingerprint()
+        if where is None:
+            if not self.SolCount:
+                return False
+            obj = self.ObjVal
+        elif where == GRB.Callback.MIPSOL:
+            obj = self.cbGet(GRB.Callback.MIPSOL_OBJ)
+        else:
+            raise ValueError("`where` is must be one of: None, GRB.Callback.MIPSOL")
+
+        if not overwrite:
+            old = store.read(fingerprint, parameter_string)
+            if old is not None and (obj - old['obj']) * self.ModelSense >= 0:
+                return False
+
+        layout = self.get_var_layout()
+        families = dict()
+        for var_attr, (keys, vals) in self.get_var_value_arrays(where=where, eps=eps).items():
+            if keys is None:
+                families[var_attr] = {'value': float(vals[0])}
+            else:
+                families[var_attr] = {'key_hash': _hash_keys(layout.keys[var_attr]), 'keys': keys,
+                                      'values': vals.tolist()}
+        store.write(fingerprint, parameter_string, {'obj': obj, 'families': families})
+        return True
 
-            try:
-                val = attr.type(self.model.getAttr(INFO_ATTR_TO_MODEL_ATTR[attr.name]))
-            except AttributeError:
-                val = None
-            kwargs[attr.name] = val
-        return GurobiModelInformation(**kwargs)
+    def load_warm_start(self, store: WarmStartStore, parameter_string: str, fingerprint: str = None,
+                        tolerance=0.0) -> bool:
+        """
+        Set the ``Start`` attribute of all annotated variables from the incumbent saved in ``store``, in bulk.
+        Variables without a stored value start at 0.  If the key set of a family has changed since saving, stored
+        entries whose key no longer exists are dropped and new variables are left undefined for the solver to
+        complete; if more than a fraction ``tolerance`` of a family's stored entries are dropped, the saved incumbent
+        is considered stale and nothing is loaded.  Returns True if the start was loaded.
+        """
+        if fingerprint is None:
+            fingerprint = self.get_fingerprint()
+        data = store.read(fingerprint, parameter_string)
+        if data is None or set(data['families']) != set(self.__vars__):
+            return False
+
+        layout = self.get_var_layout()
+        start = np.zeros(len(layout))
+        for var_attr in self.__vars__:
+            family = data['families'][var_attr]
+            sl = layout.slices[var_attr]
+            keys = layout.keys[var_attr]
+            if keys is None:
+                start[sl] = family['value']
+                continue
+            if family['key_hash'] != _hash_keys(keys):
+                start[sl] = GRB.UNDEFINED
+            position = dict(zip(keys, range(sl.start, sl.stop)))
+            idx = [position.get(k) for k in map(_tuplify, family['keys'])]
+            found = np.fromiter((i is not None for i in idx), dtype=bool, count=len(idx))
+            if len(idx) > 0 and (len(idx) - found.sum()) / len(idx) > tolerance:
+                return False
+            start[np.fromiter(compress(idx, found), dtype=np.int64)] = np.asarray(family['values'])[found]
+
+        self.setAttr("Start", layout.vars, start.tolist())
+        return True
+
+    def save_build_cache(self, cache: ModelBuildCache, key: str):
+        """
+        Save this fully built model to ``cache`` under ``key``, together with the keys and indices of every annotated
+        variable family and every ``self.cons`` group (which must contain linear constraints only).  Other attributes
+        set by the build code are not saved.
+        """
+        self.update()
+        families = dict()
+        for var_attr in self.__vars__:
+            family = getattr(self, var_attr)
+            if var_attr in self.__lonevars__:
+                families[var_attr] = {'keys': None, 'indices': [family.index]}
+            else:
+                families[var_attr] = {'keys': list(family.keys()), 'indices': [v.index for v in family.values()],
+                                      'tupledict': isinstance(family, tupledict)}
+        cons = dict()
+        for name, group in self.cons.items():
+            items = self.get_cons_group_items(name)
+            if not all(isinstance(c, Constr) for _, c in items):
+                raise TypeError(f"constraint group `{name}` contains non-linear constraints and cannot be cached")
+            if isinstance(group, Constr):
+                kind = 'single'
+            elif isinstance(group, dict):
+                kind = 'tupledict' if isinstance(group, tupledict) else 'dict'
+            else:
+                kind = 'list'
+            cons[name] = {'kind': kind, 'keys': [k for k, _ in items] if kind != 'list' else None,
+                          'indices': [c.index for _, c in items]}
+
+        self.write(str(cache.model_path(key)))
+        self.write(str(cache.params_path(key)))
+        # the layout file marks the entry as complete, so it must appear atomically
+        path = cache.layout_path(key)
+        tmp_path = path.with_suffix('.tmp')
+        with lzma.open(tmp_path, 'wt') as fp:
+            json.dump({'families': families, 'cons': cons}, fp)
+        tmp_path.replace(path)
+
+    def load_build_cache(self, cache: ModelBuildCache, key: str) -> bool:
+        """
+        Replace the underlying solver model with the one saved in ``cache`` under ``key`` and rebuild the annotated
+        variable families and ``self.cons`` groups from the saved index maps, so the build code can be skipped.
+        Returns False if there is no such entry.
+        """
+        if key not in cache:
+            return False
+        with lzma.open(cache.layout_path(key), 'rt') as fp:
+            layout = json.load(fp)
+        if set(layout['families']) != set(self.__vars__):
+            raise ValueError(f"cached model `{key}` has variable families {', '.join(layout['families'])}, expected "
+                             f"{', '.join(self.__vars__)}")
+
+        model = read(str(cache.model_path(key)), env=self.env)
+        model.read(str(cache.params_path(key)))
+        model._parent = self
+        self.model = model
+        self._attr_snapshot = None
+        self._model_changes += 1
+        self._relaxed = None
+        allvars = model.getVars()
+        for var_attr, family in layout['families'].items():
+            vars = [allvars[i] for i in family['indices']]
+            if family['keys'] is None:
+                setattr(self, var_attr, vars[0])
+            else:
+                vardict_type = tupledict if family['tupledict'] else self.get_var_metadata().types[var_attr]
+                setattr(self, var_attr, vardict_type(zip(map(_tuplify, family['keys']), vars)))
+
+        allconstrs = model.getConstrs()
+        self.cons = dict()
+        for name, group in layout['cons'].items():
+            constrs = [allconstrs[i] for i in group['indices']]
+            if group['kind'] == 'single':
+                self.cons[name] = constrs[0]
+            elif group['kind'] == 'list':
+                self.cons[name] = constrs
+            else:
+                constrdict_type = tupledict if group['kind'] == 'tupledict' else dict
+                self.cons[name] = constrdict_type(zip(map(_tuplify, group['keys']), constrs))
+        self._var_layout = None
+        return True
+
+    def get_var_key_names(self) -> Callable[[Var], str]:
+        """
+        Returns a function mapping a variable of an annotated family to a name of the form ``X[i,j]``, derived from the
+        family name and its tuple key, for use with :py:func:`format_constraint`.  Other variables are named by their
+        ``VarName``.
+        """
+        layout = self.get_var_layout()
+        names = dict()
+        for var_attr in self.__vars__:
+            vars = layout.vars[layout.slices[var_attr]]
+            keys = layout.keys[var_attr] or [None]
+            names.update(zip((v.index for v in vars), (_format_key(var_attr, k) for k in keys)))
+
+        def var_names(var: Var):
+            name = names.get(var.index)
+            return var.VarName if name is None else name
+
+        return var_names
+
+    def format_constraints(self, groups=None, var_keys=False, eps=EPS):
+        """
+        Generate formatted lines ``name[key]: <constraint>`` for the constraint groups ``groups`` of ``self.cons``
+        (default all), using sparse row queries.  If ``var_keys`` is True, variables are named by their annotated
+        family and tuple key rather than ``VarName``.
+        """
+        if groups is None:
+            groups = self.cons.keys()
+        elif isinstance(groups, str):
+            groups = [groups]
+        var_names = self.get_var_key_names() if var_keys else None
+        for name in groups:
+            items = self.get_cons_group_items(name)
+            constrs = [c for _, c in items]
+            senses = self.model.getAttr("Sense", constrs)
+            rhs = self.model.getAttr("RHS", constrs)
+            for (key, cons), sense, b in zip(items, senses, rhs):
+                yield _format_key(name, key) + ': ' + _format_row(self.model.getRow(cons), sense, b, self.model, eps,
+                                                                 var_names)
+
+    def pprint_constraints(self, groups=None, var_keys=False, eps=EPS, file=None):
+        """Print the constraint groups ``groups`` of ``self.cons`` line by line to ``file``, see
+        :py:meth:`format_constraints`."""
+        for line in self.format_constraints(groups, var_keys, eps):
+            print(line, file=file)
+
+    def update_cut_activity(self, where=None, tol=EPS):
+        """
+        Count cached cuts which are violated or binding at the current solution (``where=None``), the new MIP
+        solution (``where=GRB.Callback.MIPSOL``) or the node relaxation (``where=GRB.Callback.MIPNODE``).  These counts
+        drive the ``'activity'`` eviction policy of the cut pool.
+        """
+        allvars = self.model.getVars()
+        return self.cut_cache.record_activity(self._query_var_values(allvars, where), tol)
+
+    def get_cut_cache_stats(self) -> Dict[str, CutCacheStats]:
+        return self.cut_cache.stats
+
+    def get_gurobi_model_information(self) -> GurobiModelInformation:
+        return _get_model_information(self._get_attr)
 
     def _add_cut_to_cache(self, cut, cache, cache_key=None):
-        if cache_key is not None:
-            if cache not in self.cut_cache:
-                self.cut_cache[cache] = dict()
-            self.cut_cache[cache][cache_key] = cut
-            self.cut_cache_size += 1
-        else:
-            if cache not in self.cut_cache:
-                self.cut_cache[cache] = deque()
-            self.cut_cache[cache].append(cut)
-            self.cut_cache_size += 1
+        self.cut_cache.add(cache, cut, cache_key)
 
     def cbCut(self, cut: TempConstr, cache: str = None, cache_key=None):
         super().cbCut(cut)
+        if self._separator_stats is not None:
+            self._separator_stats.cuts += 1
         if cache is not None:
             self._add_cut_to_cache(cut, cache, cache_key)
 
     def cbLazy(self, cut: TempConstr, cache: str = None, cache_key=None):
         super().cbLazy(cut)
+        if self._separator_stats is not None:
+            self._separator_stats.cuts += 1
         if cache is not None:
             self._add_cut_to_cache(cut, cache, cache_key)
 
+    def race(self, param_sets: List[Dict[str, Any]], cores: int = None, time_limit: float = None,
+             eps=EPS) -> RaceResult:
+        """
+        Solve copies of this model concurrently in worker processes, each with the parameters of one entry of
+        ``param_sets`` applied on top of this model's parameters (as for :py:meth:`temp_params`).  At most ``cores``
+        (default: all CPUs) threads are used in total; if there are more parameter sets than cores, runs are started
+        as earlier ones finish.  The first run to prove optimality wins and all other runs are terminated; otherwise
+        the best incumbent found within ``time_limit`` seconds wins.  The winning solution is loaded into the
+        ``<name>v`` dictionaries.
+        """
+        if cores is None:
+            cores = os.cpu_count()
+        n_concurrent = max(1, min(len(param_sets), cores))
+        threads = max(1, cores // n_concurrent)
+        deadline = None if time_limit is None else time.time() + time_limit
+        n = len(param_sets)
+        status, obj_val, obj_bound, runtime, solutions = [None] * n, [None] * n, [None] * n, [None] * n, [None] * n
+        winner = None
+
+        ctx = multiprocessing.get_context('spawn')
+        stop = ctx.Event()
+        results = ctx.Queue()
+        running = dict()
+        pending = list(range(n))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model_file = os.path.join(tmpdir, 'model.mps')
+            params_file = os.path.join(tmpdir, 'model.prm')
+            self.write(model_file)
+            self.write(params_file)
+            try:
+                while len(running) > 0 or (len(pending) > 0 and not stop.is_set()):
+                    while len(pending) > 0 and len(running) < n_concurrent and not stop.is_set():
+                        run = pending.pop(0)
+                        params = dict(param_sets[run], Threads=threads)
+                        if deadline is not None:
+                            remaining = deadline - time.time()
+                            if remaining <= 0:
+                                pending.clear()
+                                break
+                            params['TimeLimit'] = min(params.get('TimeLimit', GRB.INFINITY), remaining)
+                        proc = ctx.Process(target=_race_worker,
+                                           args=(run, model_file, params_file, params, stop, results), daemon=True)
+                        proc.start()
+                        running[run] = proc
+                    if len(running) == 0:
+                        break
+                    try:
+                        run, status[run], obj_val[run], obj_bound[run], runtime[run], solutions[run] = \
+                            results.get(timeout=1)
+                    except queue.Empty:
+                        for run, proc in list(running.items()):
+                            if not proc.is_alive() and proc.exitcode != 0:
+                                del running[run]
+                        continue
+                    proc = running.pop(run, None)  # may already be reaped above if it failed after reporting
+                    if proc is not None:
+                        proc.join()
+                    if status[run] == GRB.OPTIMAL and winner is None:
+                        winner = run
+                        stop.set()
+            finally:
+                stop.set()
+                for proc in running.values():
+                    proc.join()
+
+        if winner is None:
+            sense = self.ModelSense
+            candidates = [run for run in range(n) if solutions[run] is not None]
+            if len(candidates) > 0:
+                winner = min(candidates, key=lambda run: obj_val[run] * sense)
+        if winner is not None:
+            layout = self.get_var_layout()
+            indices = np.fromiter((v.index for v in layout.vars), dtype=np.int64, count=len(layout))
+            self._store_var_values(layout, solutions[winner][indices], eps)
+
+        return RaceResult(winner=winner, params=[dict(p) for p in param_sets], status=status, obj_val=obj_val,
+                          obj_bound=obj_bound, runtime=runtime)
+
     def temp_params(self, **param_val_pairs):
         return TempModelParameters(self, **param_val_pairs)
 
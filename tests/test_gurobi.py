@@ -1,9 +1,13 @@
 import gurobi
 import random
+import numpy as np
 from oru import grb
 import tempfile
 import os
+import time
 from gurobi import GRB
+import pytest
+from pytest import approx
 
 class ExampleModel(grb.BaseGurobiModel):
     X: grb.BinVarDict
@@ -48,3 +52,604 @@ def test_variable_switching():
     model.optimize()
     assert model.IsMIP == 1
     assert all(var.vtype == GRB.BINARY for _, var in model.X.items())
+
+def test_bulk_var_values():
+    model = ExampleModel()
+    model.optimize()
+    model.update_var_values()
+    expected = {k: var.X for k, var in model.X.items() if var.X > grb.EPS}
+    assert model.Xv == expected
+    keys, vals = model.get_var_value_arrays()['X']
+    assert keys == list(model.X.keys())
+    assert vals.tolist() == [var.X for var in model.X.values()]
+
+
+def test_var_layout_replaced_family():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.optimize()
+    vars = list(model.X.values())
+    for _ in range(20):
+        model.X = dict(enumerate(vars))
+        model.freeze_var_layout()
+        model.X = None  # free the dict the layout was built from, so a new one may reuse its address
+        model.X = dict(enumerate(reversed(vars)))
+        model.update_var_values(eps=None)
+        assert model.Xv == {k: v.X for k, v in model.X.items()}
+        vars.reverse()
+
+
+def test_compact_var_values():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.optimize()
+    model.update_var_values()
+    expected = model.Xv
+    model.update_var_values(compact=True)
+    assert isinstance(model.Xv, grb.CompactVarValues)
+    assert model.Xv == expected
+    assert dict(model.Xv.items()) == expected
+    assert 0 < len(model.Xv) < len(model.X)
+    k = next(k for k in model.X if k not in expected)
+    assert k not in model.Xv
+    history = [model.Xv]
+    model.update_var_values(compact=True)
+    assert model.Xv.key_index is history[0].key_index
+    model.update_var_values(compact=True, eps=None)
+    assert len(model.Xv) == len(model.X) and model.Xv.index is None
+    assert model.Xv[k] == approx(model.X[k].X)
+
+    model.compact_var_values = True
+    with model.relaxed() as lp:
+        lp.optimize()
+    assert isinstance(model.Xv, grb.CompactVarValues)
+
+def test_callback_var_values():
+    model = ExampleModel()
+    model.freeze_var_layout()
+    solutions = []
+
+    def callback(m: ExampleModel, where):
+        if where == GRB.Callback.MIPSOL:
+            m.update_var_values(where)
+            solutions.append((m.Xv, m.cbGet(GRB.Callback.MIPSOL_OBJ)))
+
+    model.optimize(callback)
+    assert len(solutions) > 0
+    for xv, obj in solutions:
+        assert sum(model.X[k].Obj * v for k, v in xv.items()) == approx(obj)
+
+def test_flush_cut_cache_dedup():
+    model = ExampleModel()
+    model.update()
+    X = model.X
+    cuts_a = {
+        0: X[0] + X[1] <= 1,
+        1: 2 * X[1] + 2 * X[0] <= 2,  # duplicate after scaling
+        2: X[0] + X[1] <= 1.5,  # dominated
+        3: -X[2] - X[3] >= -1,  # same as 0 on different vars
+    }
+    for key, cut in cuts_a.items():
+        model.cut_cache.add('a', cut, key)
+    model.cut_cache.add('b', X[0] + X[2] <= 1)
+    model.cut_cache.add('b', X[2] + X[0] <= 1)
+    assert model.flush_cut_cache() == 3
+    assert model.cut_flush_stats['a'] == grb.CutFlushStats(added=2, dropped=2)
+    assert model.cut_flush_stats['b'] == grb.CutFlushStats(added=1, dropped=1)
+    assert set(model.cons['a'].keys()) == {0, 3}
+    model.update()
+    assert model.cons['a'][0].RHS == approx(1)
+    assert model.cons['a'][3].RHS == approx(-1)
+    assert model.cons['a'][3].Sense == GRB.GREATER_EQUAL
+    assert model.getCoeff(model.cons['a'][3], X[2]) == approx(-1)
+    model.cut_cache.add('c', 3 * X[0] + 7 * X[1] >= 2)
+    model.flush_cut_cache()
+    model.update()
+    cons = model.cons['c'][0]
+    assert (cons.Sense, cons.RHS) == (GRB.GREATER_EQUAL, approx(2))
+    assert [model.getCoeff(cons, X[0]), model.getCoeff(cons, X[1])] == approx([3, 7])
+    assert model.cut_cache_size == 0
+
+
+def test_cut_pool_eviction():
+    model = ExampleModel()
+    model.update()
+    X = model.X
+    model.cut_cache = grb.CutPool(max_size=10, policy='age', evict_to=0.5)
+    for i in range(11):
+        model.cut_cache.add('c', X[i] + X[i + 1] <= 1, i)
+    stats = model.get_cut_cache_stats()['c']
+    assert stats.evicted == 6 and stats.size == 5 and model.cut_cache_size == 5
+    assert set(model.cut_cache['c']) == set(range(6, 11))
+    model.cut_cache.add('c', X[10] + X[11] <= 1, 10)
+    assert model.cut_cache['c'][10].hits == 1
+    assert model.flush_cut_cache() == 5
+    assert model.cut_cache_size == 0
+    assert model.get_cut_cache_stats()['c'].flushed == 5
+
+    model.cut_cache.add('d', 3 * X[1] + 7 * X[0] >= 2)
+    indices, coeffs, sense, rhs = model.cut_cache['d'][0].original_row
+    assert indices.tolist() == [X[0].index, X[1].index]
+    assert coeffs.tolist() == approx([7, 3]) and sense == GRB.GREATER_EQUAL and rhs == approx(2)
+
+def test_callback_profile():
+    model = ExampleModel()
+    model.setParam("LazyConstraints", 1)
+
+    def callback(m: ExampleModel, where):
+        if where == GRB.Callback.MIPSOL:
+            m.update_var_values(where)
+            m.cbLazy(gurobi.quicksum(m.X[k] for k in m.Xv) <= len(m.Xv))
+
+    model.optimize(callback, profile=True)
+    profile = model.get_callback_profile()
+    assert profile.calls['MIPSOL'] > 0
+    assert profile.lazy_constraints['MIPSOL'] == profile.calls['MIPSOL']
+    assert profile.min_time['MIPSOL'] <= profile.p50_time['MIPSOL'] <= profile.max_time['MIPSOL']
+    fp = tempfile.NamedTemporaryFile(mode="w+", delete=False)
+    fp.close()
+    profile.to_json_file(fp.name)
+    assert grb.CallbackProfile.from_json_file(fp.name) == profile
+    os.remove(fp.name)
+    model.optimize()
+    assert model.get_callback_profile() is None
+
+def test_solve_trace_recorder():
+    model = ExampleModel()
+    recorder = grb.SolveTraceRecorder(interval=0, capacity=4)
+    model.optimize(recorder=recorder)
+    trace = recorder.get_trace()
+    assert recorder.num_samples > 0
+    assert len(trace['time']) == min(4, recorder.num_samples)
+    assert (trace['time'][1:] >= trace['time'][:-1]).all()
+    assert recorder.info == model.get_gurobi_model_information()
+    fp = tempfile.NamedTemporaryFile(suffix=".npz", delete=False)
+    fp.close()
+    recorder.to_file(fp.name)
+    trace_copy, info_copy = grb.SolveTraceRecorder.read_file(fp.name)
+    os.remove(fp.name)
+    assert info_copy == recorder.info
+    for k in trace:
+        np.testing.assert_array_equal(trace_copy[k], trace[k])
+
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    recorder = grb.SolveTraceRecorder(interval=np.inf)
+    model.optimize(recorder=recorder)
+    trace = recorder.get_trace()
+    mipsol = trace['where'] == GRB.Callback.MIPSOL
+    assert mipsol.any()
+    assert (np.abs(trace['obj_best'][mipsol]) < GRB.INFINITY).all()
+    assert trace['sol_count'][mipsol][0] == 1
+    assert trace['obj_best'][mipsol][-1] == approx(model.ObjVal)
+
+def test_format_constraints():
+    model = ExampleModel()
+    model.update()
+    cons = model.cons['cons'][0]
+    row = model.getRow(cons)
+    expected = ' '.join(f'+ {row.getVar(i).VarName}' for i in range(row.size()))
+    assert grb.format_constraint(cons, model.model) == f'{expected} {cons.Sense} {cons.RHS}'
+    lines = list(model.format_constraints('cons', var_keys=True))
+    assert len(lines) == len(model.cons['cons'])
+    assert lines[0].startswith('cons[0]: + X[')
+
+def test_iis():
+    model = ExampleModel()
+    model.cons['infeasible'] = {
+        'a': model.addConstr(model.X[0] + model.X[1] >= 2),
+        'b': model.addConstr(model.X[0] + model.X[1] <= 1),
+    }
+    model.X[2].UB = 0
+    model.cons['bound'] = model.addConstr(model.X[2] >= 1)
+    model.optimize()
+    model.computeIIS()
+    iis = model.get_iis_constraints()
+    assert set(iis.keys()) in ({'infeasible'}, {'bound'})
+    if 'infeasible' in iis:
+        assert sorted(iis['infeasible']) == ['a', 'b']
+    else:
+        assert iis['bound'] is None
+        _, ub = model.get_iis_bounds()
+        assert ub == {'X': [2]}
+    assert model.compute_group_iis(method='deletion') in (['infeasible'], ['bound'])
+    assert model.cons['bound'].RHS == 1
+    assert set(model.compute_group_iis(method='feasrelax')) <= {'infeasible', 'bound'}
+
+def test_warm_start_store():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = grb.WarmStartStore(tmpdir)
+        model = ExampleModel()
+        assert not model.load_warm_start(store, 'params')
+        model.setAttr("ModelSense", GRB.MAXIMIZE)
+        model.optimize()
+        assert model.save_warm_start(store, 'params')
+        assert not model.save_warm_start(store, 'params')
+        model.update_var_values()
+        xv = model.Xv
+
+        model = ExampleModel()
+        assert not model.load_warm_start(store, 'params')  # different objective sense, different instance
+        model.setAttr("ModelSense", GRB.MAXIMIZE)
+        assert model.load_warm_start(store, 'params')
+        model.update()
+        starts = {k: var.Start for k, var in model.X.items() if var.Start > grb.EPS}
+        assert starts == approx(xv)
+        del model.X[max(xv)]
+        assert not model.load_warm_start(store, 'params', tolerance=0)
+        assert model.load_warm_start(store, 'params', tolerance=0.5)
+
+        model = ExampleModel()
+        model.setAttr("ModelSense", GRB.MAXIMIZE)
+        model.setAttr("RHS", model.cons['cons'][-1], 50)
+        assert not model.load_warm_start(store, 'params')
+        model.optimize()
+        assert model.save_warm_start(store, 'params')
+
+class CachedExampleModel(ExampleModel):
+    def __init__(self, cache: grb.ModelBuildCache):
+        key = cache.make_key('example', seed=1337)
+        grb.BaseGurobiModel.__init__(self)
+        self.from_cache = self.load_build_cache(cache, key)
+        if not self.from_cache:
+            super().__init__()
+            self.save_build_cache(cache, key)
+
+
+def test_build_cache():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = grb.ModelBuildCache(tmpdir)
+        model = CachedExampleModel(cache)
+        assert not model.from_cache
+        model.optimize()
+        cached = CachedExampleModel(cache)
+        assert cached.from_cache
+        assert cached.getParamInfo("OutputFlag")[2] == 0
+        cached.optimize()
+        assert cached.ObjVal == approx(model.ObjVal)
+        assert list(cached.X.keys()) == list(model.X.keys())
+        assert cached.cons_size == model.cons_size
+        assert all(cached.X[k].Obj == approx(model.X[k].Obj) for k in model.X)
+
+        # loading replaces the model, so the cached relaxation of the old one must not be reused
+        other = ExampleModel()
+        other.setAttr("RHS", other.cons['cons'][0], 0)
+        other.save_build_cache(cache, 'other')
+        with model.relaxed() as lp:
+            pass
+        assert model.load_build_cache(cache, 'other')
+        with model.relaxed() as lp:
+            assert lp.getConstrs()[model.cons['cons'][0].index].RHS == 0
+        assert not any(name.endswith('.tmp') for name in os.listdir(tmpdir))
+
+def test_race():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    result = model.race([{"MIPFocus": 1}, {"MIPFocus": 2, "Cuts": 0}], cores=2, time_limit=60)
+    assert result.winner is not None
+    assert result.status[result.winner] == GRB.OPTIMAL
+    model.update()
+    assert sum(model.X[k].Obj * v for k, v in model.Xv.items()) == approx(result.obj_val[result.winner])
+
+def test_attr_snapshot():
+    model = ExampleModel()
+    model.optimize()
+    assert model.ObjVal == model.model.getAttr("ObjVal")
+    assert 'KappaExact' not in model._attr_snapshot
+    assert model.Kappa is None
+    assert 'Kappa' in model._attr_snapshot
+    num_constrs = model.NumConstrs
+    model.addConstr(model.X[0] <= 0)
+    model.update()
+    assert model.NumConstrs == num_constrs + 1
+    model.optimize()
+    assert model.ObjVal == model.model.getAttr("ObjVal")
+
+def test_relaxed():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.optimize()
+    mip_obj = model.ObjVal
+    for in_place in (False, True, False):
+        with model.relaxed(in_place=in_place) as lp:
+            lp.optimize()
+            lp_obj = lp.ObjVal
+        assert lp_obj >= mip_obj - 1e-6
+        assert sum(model.X[k].Obj * v for k, v in model.Xv.items()) == approx(lp_obj, abs=1e-3)
+        model.update()
+        assert all(var.VType == GRB.BINARY for var in model.X.values())
+
+def test_solution_pool():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.setParam("PoolSearchMode", 2)
+    model.setParam("PoolSolutions", 10)
+    model.optimize()
+    pool = model.get_solution_pool()
+    sparse_pool = model.get_solution_pool(sparse=True)
+    assert pool.values.shape == (model.SolCount, len(model.X))
+    np.testing.assert_allclose(sparse_pool.values.toarray(), pool.values * (np.abs(pool.values) > grb.EPS))
+    keys, block = pool.get_family('X')
+    objs = np.array([model.X[k].Obj for k in keys])
+    np.testing.assert_allclose(block @ objs, pool.obj_vals, atol=1e-6)
+    assert pool.obj_vals[0] == approx(model.ObjVal)
+
+def test_var_metadata_inheritance():
+    class Base(grb.BaseGurobiModel):
+        X: grb.BinVarDict
+        z: grb.IntVar
+
+    class Derived(Base):
+        Y: grb.CtsVarDict
+
+    assert Base.get_var_metadata().vars == ('X', 'z')
+    meta = Derived.get_var_metadata()
+    assert meta.vars == ('Y', 'X', 'z')
+    assert meta.lonevars == ('z',)
+    assert Derived.get_var_metadata() is meta
+    assert Base.get_var_metadata() is not meta
+    model = Derived()
+    assert model.Y == {} and model.X == {} and model.z is None
+
+def test_resolve():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.optimize()
+    obj = model.ObjVal
+    model.resolve(rhs={'cons': {5: 0}})
+    assert model.ObjVal == approx(0) and model.Xv == {}
+    model.resolve(rhs={'cons': [c.RHS for c in model.cons['cons'][:5]] + [100]},
+                  obj={'X': 2 * np.array([var.Obj for var in model.X.values()])})
+    assert model.ObjVal == approx(2 * obj)
+    model.resolve(ub={'X': 0})
+    assert model.ObjVal == approx(0)
+    model.resolve(ub={'X': {0: 1}})
+    assert model.Xv == {0: approx(1)}
+
+class CuttingStockMaster(grb.BaseGurobiModel):
+    P: grb.CtsVarDict
+
+    def __init__(self, demand):
+        super().__init__()
+        self.setParam("OutputFlag", 0)
+        self.cons['demand'] = {i: self.addConstr(gurobi.LinExpr() >= d) for i, d in enumerate(demand)}
+        self.update()
+
+
+def test_column_pool():
+    model = CuttingStockMaster([3, 2, 4])
+    model.add_columns('P', {i: {('demand', i): 1} for i in range(3)}, obj=2)
+    model.add_columns('P', {(0, 1): {('demand', 0): 1, ('demand', 1): 1},
+                            (1, 2): {('demand', 1): 1, ('demand', 2): 1}}, obj=1)
+    model.optimize()
+    obj = model.ObjVal
+    model.deactivate_columns('P', keys=[(1, 2)])
+    assert (1, 2) not in model.P
+    model.optimize()
+    assert model.ObjVal > obj
+    added = model.reprice_column_pool('P')
+    assert list(added) == [(1, 2)] and len(model.column_pool) == 0
+    model.optimize()
+    assert model.ObjVal == approx(obj)
+    moved = model.deactivate_columns('P')
+    assert sorted(moved) == [0, 1, 2] and len(model.column_pool) == 3
+    model.optimize()
+    assert model.ObjVal == approx(obj)
+    assert model.reprice_column_pool('P') == {}
+
+
+def test_column_pool_var_layout():
+    model = CuttingStockMaster([3, 2, 4])
+    model.add_columns('P', {i: {('demand', i): 1} for i in range(3)}, obj=2)
+    model.add_columns('P', {(0, 1): {('demand', 0): 1, ('demand', 1): 1},
+                            (1, 2): {('demand', 1): 1, ('demand', 2): 1}}, obj=1)
+    model.optimize()
+    model.update_var_values()
+    # same family object and size afterwards, but the variable at the last position has been replaced
+    model.deactivate_columns('P', keys=[(1, 2)])
+    model.optimize()
+    model.reprice_column_pool('P')
+    model.optimize()
+    model.update_var_values()
+    assert model.Pv == {k: approx(v.X) for k, v in model.P.items() if v.X > grb.EPS}
+
+
+class PooledEnvModel(grb.BaseGurobiModel):
+    env_params = {"OutputFlag": 0, "Threads": 1}
+    X: grb.BinVarDict
+
+
+def test_env_pool():
+    a = PooledEnvModel()
+    b = PooledEnvModel()
+    assert a.env is b.env
+    assert a.model.getParamInfo("Threads")[2] == 1
+    assert a.model.getParamInfo("OutputFlag")[2] == 0
+    env = grb.ENV_POOL.get(OutputFlag=0)
+    c = PooledEnvModel(env=env)
+    assert c.env is env and c.model.getParamInfo("Threads")[2] == 0
+
+
+def test_heuristic_runner():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.setParam("Heuristics", 0)
+    model.setParam("Presolve", 0)
+    points = []
+
+    def heuristic(values, is_incumbent):
+        points.append(is_incumbent)
+        return {'X': {k: 0 for k in values['X']}}
+
+    runner = grb.HeuristicRunner(heuristic)
+    model.optimize(heuristic=runner)
+    stats = runner.stats
+    assert len(points) > 0 and any(points)
+    assert stats.solutions == stats.injected + stats.dropped_stale + stats.dropped_dominated
+    assert stats.accepted <= stats.injected
+
+    def failing(values, is_incumbent):
+        raise RuntimeError("heuristic failed")
+
+    model.reset()
+    with pytest.raises(RuntimeError):
+        model.optimize(heuristic=grb.HeuristicRunner(failing))
+
+    def polling(values, is_incumbent):
+        while not polling_runner.stopping:
+            time.sleep(0.01)
+
+    def stuck(values, is_incumbent):
+        time.sleep(2)
+        raise RuntimeError("too late")
+
+    polling_runner = grb.HeuristicRunner(polling, join_timeout=None)
+    for runner in (polling_runner, grb.HeuristicRunner(stuck, join_timeout=0.1)):
+        model.reset()
+        start = time.perf_counter()
+        model.optimize(heuristic=runner)
+        assert runner.stopping and runner.stats.solutions == 0
+        assert time.perf_counter() - start < 1.5
+
+
+def test_separation_scheduler():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.setParam("Heuristics", 0)
+    model.setParam("Presolve", 0)
+    model.setParam("PreCrush", 1)
+    model.setParam("LazyConstraints", 1)
+    X = model.X
+    scheduler = grb.SeparationScheduler()
+    scheduler.register('redundant', lambda m, where: m.cbCut(X[0] <= 1))
+    scheduler.register('fruitless', lambda m, where: None)
+    scheduler.register('lazy', lambda m, where: None, where=GRB.Callback.MIPSOL, lazy=True)
+    model.optimize(scheduler)
+    stats = scheduler.get_stats()
+    assert stats['redundant'].calls > 0 and stats['redundant'].cuts == stats['redundant'].calls
+    assert stats['fruitless'].calls > 0 and stats['fruitless'].skipped > 0 and stats['fruitless'].interval > 1
+    assert stats['lazy'].calls > 0 and stats['lazy'].skipped == 0
+
+    model.reset()
+    scheduler = grb.SeparationScheduler()
+    scheduler.register('lazy', lambda m, where: None, where=GRB.Callback.MIPSOL, lazy=True)
+    scheduler.register('optional', lambda m, where: None, where=GRB.Callback.MIPSOL)
+    incumbents = []
+
+    def callback(m, where):
+        if where == GRB.Callback.MIPSOL:
+            incumbents.append(where)
+        scheduler(m, where)
+        scheduler(m, where)  # the same incumbent again
+
+    model.optimize(callback)
+    stats = scheduler.get_stats()
+    assert stats['lazy'].calls == 2 * len(incumbents) > 0 and stats['lazy'].skipped == 0
+    assert stats['optional'].calls <= len(incumbents) <= stats['optional'].skipped
+
+    model.reset()
+    scheduler = grb.SeparationScheduler()
+    root_cuts = []
+
+    def separator(m, where):
+        if m.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0 and len(root_cuts) < 3:
+            root_cuts.append(X[len(root_cuts)])
+            m.cbCut(root_cuts[-1] <= 0)
+
+    scheduler.register('rounds', separator)
+    model.optimize(scheduler)
+    # every root round after one that found a cut is run
+    assert len(root_cuts) == 3
+
+
+def test_incumbent_hashing():
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.setParam("Heuristics", 0)
+    model.setParam("Presolve", 0)
+    model.setParam("LazyConstraints", 1)
+    seen = []
+
+    def callback(m: ExampleModel, where):
+        if where == GRB.Callback.MIPSOL:
+            is_new = m.update_incumbent()
+            seen.append((is_new, dict(m.Xv), m.changed_var_keys['X']))
+            assert m.update_incumbent() is False
+            assert m.changed_var_keys['X'] == []
+
+    model.optimize(callback)
+    assert len(seen) > 0
+    assert seen[0][0] and len(seen[0][2]) == len(model.X)
+    prev = seen[0][1]
+    for is_new, xv, changed in seen[1:]:
+        assert set(changed) == {k for k in model.X if abs(xv.get(k, 0) - prev.get(k, 0)) > grb.EPS}
+        prev = xv
+
+
+def test_row_generation():
+    def chunk_rows(model, keys):
+        return {k: gurobi.quicksum(model.X[i] for i in range(10 * k, 10 * k + 10)) <= 3 for k in keys}
+
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    model.cons['chunk'] = {k: model.addConstr(c) for k, c in chunk_rows(model, range(10)).items()}
+    model.optimize()
+    expected = model.ObjVal
+
+    def oracle(m):
+        return chunk_rows(m, [k for k in range(10) if sum(m.Xv.get(i, 0) for i in range(10 * k, 10 * k + 10)) > 3.5])
+
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    trace = model.row_generation({'chunk': oracle})
+    assert trace.stop_reason == 'converged'
+    assert trace.iterations > 1 and trace.rows['chunk'][-1] == 0
+    assert sum(trace.rows['chunk']) == len(model.cons['chunk']) <= 10
+    assert model.ObjVal == approx(expected)
+    assert len(trace.solve_time) == trace.iterations
+
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    trace = model.row_generation({'chunk': oracle}, max_iterations=1)
+    assert trace.stop_reason == 'iteration_limit' and trace.iterations == 1
+
+    model = ExampleModel()
+    model.setAttr("ModelSense", GRB.MAXIMIZE)
+    # an oracle which keeps returning rows it has returned before, violated or not
+    trace = model.row_generation({'chunk': lambda m: chunk_rows(m, range(10))}, max_iterations=10)
+    assert trace.stop_reason == 'converged'
+    assert len(model.cons['chunk']) == sum(trace.rows['chunk']) <= 10
+    assert model.ObjVal == approx(expected)
+    cons = next(iter(model.cons['chunk'].values()))
+    assert cons.RHS == approx(3)
+
+
+def test_basis_snapshot():
+    def lp():
+        model = ExampleModel()
+        model.setAttr("ModelSense", GRB.MAXIMIZE)
+        model.setParam("Method", 0)
+        model.set_variables_continuous()
+        return model
+
+    model = lp()
+    model.optimize()
+    obj = model.ObjVal
+    basis = model.get_basis()
+    duals = basis.get_duals('cons')
+    assert list(duals) == list(range(6))
+    assert duals == {k: approx(c.Pi) for k, c in enumerate(model.cons['cons'])}
+    keys, vbasis, rc = basis.get_family('X')
+    assert len(keys) == len(vbasis) == len(rc) == 100
+
+    model = lp()
+    assert model.set_basis(basis) == (100, 6)
+    model.optimize()
+    assert model.ObjVal == approx(obj)
+    assert model.IterCount == 0
+
+    model = lp()
+    model.X = {k: v for k, v in model.X.items() if k != 0}
+    assert model.set_basis(basis) == (99, 6)
+    model.optimize()
+    assert model.ObjVal == approx(obj)